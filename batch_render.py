@@ -0,0 +1,335 @@
+import os
+import json
+import time
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from channel import GENESIS_DATE, FORECAST_DAYS, BAND_QUANTILES, BAND_LABELS, fit_quantile, load_prices
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+INPUT_CSV = "data/BTC_Prices.csv"
+OUTPUT_DIR = "archive"
+FRAMES_DIR = "frames"
+ANIMATION_HTML = "btc_usd_channel_animation.html"
+FIRST_AS_OF = "2013-01-31"
+HTML_BAND_STEP_DAYS = 14    # Bands are smooth curves; the animation samples them every two weeks
+SIGNIFICANT_DIGITS = 6      # Precision of the numbers stored in the animated HTML
+JPG_WIDTH, JPG_HEIGHT, JPG_SCALE = 1600, 900, 2
+
+# (label, trace name, fill, color, line width, show in legend) in the order transform.py draws them
+BAND_TRACES = [
+    ('50%', '50% Quantile', None, 'cyan', 2, True),
+    ('0.1%', '0.1% Quantile', None, '#A8D800', 1, False),
+    ('5%', '5% Quantile', 'tonexty', '#00FF7F', 0, False),
+    ('90%', '90% Quantile', None, '#00BFFF', 1, False),
+    ('98%', '98% Quantile', 'tonexty', '#87CEFA', 1, False),
+    ('99.9%', '99.9% Quantile', 'tonexty', '#FF4500', 0, False),
+]
+
+
+def price_quantile(x, y, price, above, warm):
+    """
+    Quantile (on transform.py's 0.1% grid) whose fitted value on the last day is closest to price.
+
+    The fitted value grows with q, so a bisection over the grid needs about ten fits instead of
+    the 500 transform.py runs. `warm` maps already fitted q -> params and is extended in place.
+    """
+    import numpy as np
+
+    grid = np.arange(0.5, 1.0, 0.001) if above else np.arange(0.001, 0.501, 0.001)
+
+    def fitted_last(i):
+        q = float(grid[i])
+        nearest = min(warm, key=lambda k: abs(k - q)) if warm else None
+        params, _ = fit_quantile(x, y, q, start=warm.get(nearest))
+        warm[q] = params
+        return params[0] + params[1] * x[-1]
+
+    target = np.log(price)
+    lo, hi = 0, len(grid) - 1
+    lo_value, hi_value = fitted_last(lo), fitted_last(hi)
+    if target <= lo_value:
+        best = lo
+    elif target >= hi_value:
+        best = hi
+    else:
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            mid_value = fitted_last(mid)
+            if mid_value < target:
+                lo, lo_value = mid, mid_value
+            else:
+                hi, hi_value = mid, mid_value
+        best = lo if target - lo_value <= hi_value - target else hi
+    return f'{grid[best] * 100:.2f}%'
+
+
+def as_of_dates(dates, start=FIRST_AS_OF, end=None, explicit=None):
+    """Month-end as-of dates from start to end (or the explicit list), clipped to the data."""
+    import numpy as np
+    import pandas as pd
+
+    last = pd.Timestamp(dates[-1])
+    if explicit:
+        wanted = pd.to_datetime(explicit)
+    else:
+        wanted = pd.date_range(start=start, end=end or last, freq="ME")
+        if end is None and (len(wanted) == 0 or wanted[-1] < last):
+            wanted = wanted.append(pd.DatetimeIndex([last]))
+    wanted = [d for d in wanted if pd.Timestamp(dates[0]) <= d <= last]
+    return np.array(wanted, dtype="datetime64[D]")
+
+
+def fit_frames(dates, ind, price, as_of):
+    """Yield one frame per as-of date, refitting only the band and price quantiles, warm-started."""
+    import numpy as np
+
+    x_all, y_all = np.log(ind), np.log(price)
+    previous = {}
+    for as_of_date in as_of:
+        n = int(np.searchsorted(dates, as_of_date, side="right"))
+        x, y = x_all[:n], y_all[:n]
+
+        bands, iterations = {}, 0
+        for q, label in zip(BAND_QUANTILES, BAND_LABELS):
+            params, used = fit_quantile(x, y, q, start=previous.get(q))
+            bands[label] = params.tolist()
+            previous[q] = params
+            iterations += used
+
+        fair_value = np.exp(bands['50%'][0] + bands['50%'][1] * x[-1])
+        percent_change = (price[n - 1] - fair_value) / fair_value * 100
+        is_above = percent_change >= 0
+        label = price_quantile(x, y, price[n - 1], is_above, dict(previous))
+
+        yield {
+            "as_of": str(as_of_date),
+            "rows": n,
+            "bands": bands,
+            "price": float(price[n - 1]),
+            "percent_change": float(percent_change),
+            "quantile_label": label,
+            "iterations": iterations,
+        }
+
+
+def band_value(frame, label, ind):
+    """Band price at the given day index (scalar or array)."""
+    import numpy as np
+    intercept, slope = frame["bands"][label]
+    return np.exp(intercept + slope * np.log(ind))
+
+
+def chart_annotations(frame, last_ind):
+    """The same three footer annotations transform.py writes, for one frame."""
+    from datetime import date
+
+    latest = {label: band_value(frame, label, last_ind) for label in BAND_LABELS}
+    change_type = "above" if frame["percent_change"] >= 0 else "below"
+    fmt = "{:,.0f}".format
+    return [
+        dict(xref='paper', yref='paper', x=0.40, y=-0.05, xanchor='center', yanchor='top',
+             text='Chart Date: ' + date.fromisoformat(frame["as_of"]).strftime("%d %B %Y")
+                  + ' (' + fmt(frame["rows"]) + ' Data Points)'
+                  + '<br>Latest Price: ' + fmt(frame["price"]) + ' (' + "{:,.2f}%".format(abs(frame["percent_change"]))
+                  + f' {change_type} Fair Value); ' + frame["quantile_label"] + ' Quantile'
+                  + '<br>Fair Value: $' + fmt(latest['50%']) + ' (50% Quantile)',
+             font=dict(family='Arial', size=12, color='rgb(150,150,150)'), align='left', showarrow=False),
+        dict(xref='paper', yref='paper', x=0.65, y=-0.05, xanchor='center', yanchor='top',
+             text='98% to 99.9% Quantile (' + fmt(latest['98%']) + ' - ' + fmt(latest['99.9%']) + ')'
+                  + '<br>90% to 98% Quantile (' + fmt(latest['90%']) + ' - ' + fmt(latest['98%']) + ')'
+                  + '<br>0.1% to 5% Quantile (' + fmt(latest['0.1%']) + ' - ' + fmt(latest['5%']) + ')',
+             font=dict(family='Arial', size=12, color='rgb(150,150,150)'), align='left', showarrow=False),
+        dict(x=1, y=-0.12, xref='paper', yref='paper', xanchor='right', yanchor='auto', showarrow=False,
+             text='Chart by: <a href="https://x.com/CarlesMassa" target="_blank" style="color: white;">@CarlesMassa</a>'),
+    ]
+
+
+def figure_template():
+    """Empty figure with every trace and the layout of the daily chart; frames only swap data in."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(mode='lines', name='Price', line=dict(color='orange', width=3)))
+    for _, name, fill, color, width, showlegend in BAND_TRACES:
+        fig.add_trace(go.Scatter(mode='lines', name=name, fill=fill, line=dict(color=color, width=width),
+                                 showlegend=showlegend))
+    fig.update_layout(title='Power Law Probability Channel', xaxis_title='Date', yaxis_title='Price (USD)',
+                      yaxis_type='log', hovermode='closest', showlegend=True, legend_orientation="h",
+                      template="plotly_dark")
+    fig.update_yaxes(showgrid=False)
+    return fig
+
+
+# --- Render workers: each process keeps one figure template and one warm kaleido instance ---
+
+_worker = {}
+
+
+def _init_worker(dates, ind, price):
+    _worker.update(dates=dates, ind=ind, price=price, fig=figure_template())
+    # The first export starts kaleido's Chromium; pay for it once per worker, not per frame
+    _worker["fig"].to_image(format="jpg", width=16, height=9)
+
+
+def _render_frame(frame, path):
+    import numpy as np
+
+    dates, ind, price, fig = _worker["dates"], _worker["ind"], _worker["price"], _worker["fig"]
+    n = frame["rows"]
+    future = dates[n - 1] + np.arange(1, FORECAST_DAYS + 1)
+    band_dates = np.concatenate([dates[:n], future])
+    band_ind = np.concatenate([ind[:n], ind[n - 1] + np.arange(1, FORECAST_DAYS + 1)])
+
+    with fig.batch_update():
+        fig.data[0].x, fig.data[0].y = dates[:n], price[:n]
+        for trace, (label, *_) in zip(fig.data[1:], BAND_TRACES):
+            trace.x, trace.y = band_dates, band_value(frame, label, band_ind)
+        fig.layout.annotations = chart_annotations(frame, ind[n - 1])
+    fig.write_image(path, width=JPG_WIDTH, height=JPG_HEIGHT, scale=JPG_SCALE)
+    return path
+
+
+def round_significant(values):
+    """Round to SIGNIFICANT_DIGITS so the animation JSON stays compact."""
+    import numpy as np
+
+    values = np.asarray(values, dtype=float)
+    magnitude = np.floor(np.log10(np.abs(values)))
+    scale = 10.0 ** (SIGNIFICANT_DIGITS - 1 - magnitude)
+    return (np.round(values * scale) / scale).tolist()
+
+
+def frame_layout(frame, dates, ind):
+    """Per-frame layout: x range up to the as-of date plus the forecast, an as-of marker and the annotations."""
+    import numpy as np
+
+    n = frame["rows"]
+    as_of = str(dates[n - 1])
+    return {
+        "xaxis": {"range": [str(dates[0]), str(dates[n - 1] + np.timedelta64(FORECAST_DAYS, "D"))]},
+        "shapes": [dict(type="line", xref="x", yref="paper", x0=as_of, x1=as_of, y0=0, y1=1,
+                        line=dict(color="rgb(150,150,150)", width=1, dash="dot"))],
+        "annotations": chart_annotations(frame, ind[n - 1]),
+    }
+
+
+def write_animation(frames, dates, ind, price, path):
+    """
+    One animated HTML for all frames. The price series and the band x values live once in the
+    base traces; each frame only carries the band y arrays (plotly draws min(len(x), len(y))
+    points) and a layout update that moves the x range and the as-of marker.
+    """
+    import numpy as np
+    import plotly.io as pio
+
+    last = frames[-1]["rows"]
+    band_ind = np.arange(ind[0], ind[last - 1] + FORECAST_DAYS + 1, HTML_BAND_STEP_DAYS)
+    band_dates = np.datetime64(GENESIS_DATE, "D") + band_ind
+
+    fig = figure_template().to_plotly_json()
+    fig["data"][0]["x"] = dates[:last].astype(str).tolist()
+    fig["data"][0]["y"] = round_significant(price[:last])
+    for trace in fig["data"][1:]:
+        trace["x"] = band_dates.astype(str).tolist()
+
+    band_traces = list(range(1, len(BAND_TRACES) + 1))
+    plotly_frames = []
+    for frame in frames:
+        n = frame["rows"]
+        m = int(np.searchsorted(band_ind, ind[n - 1] + FORECAST_DAYS, side="right"))
+        data = [{"y": round_significant(band_value(frame, label, band_ind[:m]))} for label, *_ in BAND_TRACES]
+        plotly_frames.append({"name": frame["as_of"], "data": data, "traces": band_traces,
+                              "layout": frame_layout(frame, dates, ind)})
+
+    for trace, latest in zip(fig["data"][1:], plotly_frames[-1]["data"]):
+        trace["y"] = latest["y"]
+    fig["layout"].update(plotly_frames[-1]["layout"])
+    fig["layout"]["updatemenus"] = [dict(
+        type="buttons", showactive=False, x=0, y=1.12, xanchor="left",
+        buttons=[dict(label="Play", method="animate",
+                      args=[None, dict(frame=dict(duration=150, redraw=True), fromcurrent=True)])])]
+    fig["layout"]["sliders"] = [dict(
+        active=len(plotly_frames) - 1, pad=dict(t=60),
+        steps=[dict(label=f["name"][:7], method="animate",
+                    args=[[f["name"]], dict(mode="immediate", frame=dict(duration=0, redraw=True))])
+               for f in plotly_frames])]
+    fig["frames"] = plotly_frames
+
+    pio.write_html(fig, path, include_plotlyjs="directory", auto_play=False, validate=False)
+    return path
+
+
+def batch_render(input_csv=INPUT_CSV, output_dir=OUTPUT_DIR, start=FIRST_AS_OF, end=None, dates_list=None,
+                 output_format="both", workers=None):
+    """Fit and render the channel as it looked at each as-of date. Returns throughput stats."""
+    try:
+        dates, ind, price = load_prices(input_csv)
+        as_of = as_of_dates(dates, start, end, dates_list)
+        if len(as_of) == 0:
+            raise ValueError("No as-of dates fall inside the price history")
+        logging.info(f"Rendering {len(as_of)} frames from {as_of[0]} to {as_of[-1]}")
+
+        frames_dir = os.path.join(output_dir, FRAMES_DIR)
+        os.makedirs(frames_dir, exist_ok=True)
+        render_jpg = output_format in ("jpg", "both")
+        started = time.perf_counter()
+        fit_seconds = 0.0
+        frames, pending = [], []
+
+        pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker,
+                                   initargs=(dates, ind, price)) if render_jpg else None
+        try:
+            fit_started = time.perf_counter()
+            for frame in fit_frames(dates, ind, price, as_of):
+                fit_seconds += time.perf_counter() - fit_started
+                frames.append(frame)
+                if pool is not None:
+                    # Rendering overlaps with fitting the next as-of date
+                    path = os.path.join(frames_dir, f"btc_usd_chart_{frame['as_of']}.jpg")
+                    pending.append(pool.submit(_render_frame, frame, path))
+                fit_started = time.perf_counter()
+            for future in pending:
+                future.result()
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        with open(os.path.join(output_dir, "frames.json"), "w") as f:
+            json.dump(frames, f, indent=1)
+        if output_format in ("html", "both"):
+            html_path = write_animation(frames, dates, ind, price, os.path.join(output_dir, ANIMATION_HTML))
+            logging.info(f"Animated chart saved as {html_path}")
+
+        total_seconds = time.perf_counter() - started
+        stats = {
+            "frames": len(frames),
+            "fit_seconds": round(fit_seconds, 2),
+            "total_seconds": round(total_seconds, 2),
+            "fit_frames_per_minute": round(len(frames) / fit_seconds * 60, 1) if fit_seconds else None,
+            "frames_per_minute": round(len(frames) / total_seconds * 60, 1),
+            "irls_iterations": sum(frame["iterations"] for frame in frames),
+        }
+        logging.info(f"Fitted {stats['frames']} frames at {stats['fit_frames_per_minute']} frames/min; "
+                     f"end to end {stats['frames_per_minute']} frames/min ({stats['total_seconds']} s)")
+        return stats
+    except Exception as e:
+        logging.error(f"Batch render failed: {str(e)}")
+        raise
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render the Power Law Probability Channel at many as-of dates.")
+    parser.add_argument("--input", default=INPUT_CSV, help=f"Price CSV (default: {INPUT_CSV}).")
+    parser.add_argument("--output", default=OUTPUT_DIR, help=f"Output directory (default: {OUTPUT_DIR}).")
+    parser.add_argument("--start", default=FIRST_AS_OF, help=f"First month end (default: {FIRST_AS_OF}).")
+    parser.add_argument("--end", help="Last month end (default: last date in the data).")
+    parser.add_argument("--dates", help="Comma-separated as-of dates; overrides --start/--end.")
+    parser.add_argument("--format", choices=["jpg", "html", "both"], default="both",
+                        help="JPG frame set, one animated HTML, or both (default).")
+    parser.add_argument("--workers", type=int, help="Render worker processes (default: CPU count).")
+    args = parser.parse_args()
+    batch_render(args.input, args.output, args.start, args.end, args.dates.split(",") if args.dates else None,
+                 args.format, args.workers)
@@ -0,0 +1,98 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import subprocess
+from pathlib import Path
+
+# === CONFIG ===
+ROOT = Path(__file__).resolve().parent.parent
+REPEAT = 5
+HEAVY_MODULES = ("pandas", "numpy", "statsmodels", "sklearn", "plotly", "kaleido", "tweepy", "coinmetrics")
+
+# (name, command run from the repo root). Commands must not touch the network.
+CASES = [
+    ("import transform", [sys.executable, "-c", "import transform"]),
+    ("import extract", [sys.executable, "-c", "import extract"]),
+    ("import load", [sys.executable, "-c", "import load"]),
+    ("import post_to_x", [sys.executable, "-c", "import post_to_x"]),
+    ("import diagnostics", [sys.executable, "-c", "import diagnostics"]),
+    ("import batch_render", [sys.executable, "-c", "import batch_render"]),
+    ("import ingest", [sys.executable, "-c", "import sys; sys.path.insert(0, 'scripts'); import ingest"]),
+    ("import update_btc_price_coinmetrics", [sys.executable, "-c",
+        "import sys; sys.path.insert(0, 'scripts'); import update_btc_price_coinmetrics"]),
+    ("import update_gold_price_MetalsDev", [sys.executable, "-c",
+        "import sys; sys.path.insert(0, 'scripts'); import update_gold_price_MetalsDev"]),
+    ("pipeline.py --help", [sys.executable, "pipeline.py", "--help"]),
+]
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def log(msg: str):
+    print(msg, file=sys.stderr, flush=True)
+
+
+def wall_time(command) -> float:
+    """Best-of-REPEAT wall time of a fresh interpreter running command, in milliseconds."""
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def heavy_imports(command) -> dict:
+    """Cumulative import time (ms) of each heavy top-level package, from `python -X importtime`."""
+    env = dict(os.environ, PYTHONPROFILEIMPORTTIME="1")
+    result = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True, check=False)
+    found = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match and match.group(4) in HEAVY_MODULES:
+            found[match.group(4)] = int(match.group(2)) / 1000
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile start-up and import time of the pipeline entry points.")
+    parser.add_argument("--max-ms", type=float,
+                        help="Exit non-zero if `pipeline.py --help` takes longer than this many milliseconds.")
+    parser.add_argument("--fail-on-heavy", action="store_true",
+                        help="Exit non-zero if any case imports pandas, plotly, tweepy or another heavy package.")
+    parser.add_argument("--json", type=Path, help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    baseline = wall_time([sys.executable, "-c", "pass"])
+    results = []
+    for name, command in CASES:
+        elapsed = wall_time(command)
+        heavy = heavy_imports(command)
+        results.append({"case": name, "wall_ms": round(elapsed, 1), "over_interpreter_ms": round(elapsed - baseline, 1),
+                        "heavy_imports_ms": heavy})
+        loaded = ", ".join(f"{module} {ms:.0f}ms" for module, ms in sorted(heavy.items(), key=lambda kv: -kv[1]))
+        print(f"{name:<40} {elapsed:8.1f} ms   {loaded or 'no heavy imports'}")
+    print(f"{'python -c pass (interpreter baseline)':<40} {baseline:8.1f} ms")
+
+    if args.json:
+        args.json.write_text(json.dumps({"baseline_ms": round(baseline, 1), "results": results}, indent=2) + "\n")
+
+    failed = False
+    help_case = next(r for r in results if r["case"] == "pipeline.py --help")
+    if args.max_ms is not None and help_case["wall_ms"] > args.max_ms:
+        log(f"pipeline.py --help took {help_case['wall_ms']} ms (limit {args.max_ms} ms)")
+        failed = True
+    if args.fail_on_heavy:
+        for result in results:
+            if result["heavy_imports_ms"]:
+                log(f"{result['case']} imports {', '.join(sorted(result['heavy_imports_ms']))} at start-up")
+                failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
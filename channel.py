@@ -0,0 +1,54 @@
+RAW_CSV = "raw_btc_usd.csv"
+GENESIS_DATE = "2009-01-03"
+FIRST_DATE = "2010-07-18"  # Useful exchange data starts here
+FORECAST_DAYS = 5 * 365
+BAND_QUANTILES = [0.001, 0.05, 0.50, 0.90, 0.98, 0.999]
+BAND_LABELS = ['0.1%', '5%', '50%', '90%', '98%', '99.9%']
+IRLS_MAX_ITER = 10000
+IRLS_TOL = 1e-6
+
+
+def load_prices(path=RAW_CSV):
+    """
+    Daily prices from FIRST_DATE on as (dates, days since genesis, price) NumPy arrays.
+
+    Reads either raw_btc_usd.csv (time, PriceUSD) or data/BTC_Prices.csv (Date as DD/MM/YYYY, Value).
+    """
+    import numpy as np
+    import pandas as pd
+
+    df = pd.read_csv(path)
+    if "PriceUSD" in df.columns:
+        dates = pd.to_datetime(df["time"], utc=True).dt.tz_localize(None).dt.normalize()
+        values = df["PriceUSD"]
+    else:
+        dates = pd.to_datetime(df["Date"].astype(str), format="%d/%m/%Y")
+        values = df["Value"]
+    df = pd.DataFrame({"Date": dates, "Value": values.astype(float)})
+    df = df[df["Date"] >= FIRST_DATE].sort_values("Date")
+    dates = df["Date"].to_numpy(dtype="datetime64[D]")
+    ind = (dates - np.datetime64(GENESIS_DATE, "D")).astype(np.int64)
+    return dates, ind, df["Value"].to_numpy(dtype=float)
+
+
+def fit_quantile(x, y, q, start=None, max_iter=IRLS_MAX_ITER, tol=IRLS_TOL):
+    """
+    Quantile regression of y on [1, x] by iteratively reweighted least squares.
+
+    Same iteration as statsmodels' QuantReg, but it can start from a previous solution,
+    which is what makes refitting month after month cheap. Returns (params, iterations).
+    """
+    import numpy as np
+
+    X = np.column_stack([np.ones_like(x), x])
+    beta = np.ones(2) if start is None else np.asarray(start, dtype=float)
+    for iteration in range(1, max_iter + 1):
+        resid = y - X @ beta
+        resid = np.where(np.abs(resid) < 1e-6, np.where(resid < 0, -1e-6, 1e-6), resid)
+        weights = 1 / np.abs(np.where(resid < 0, q * resid, (1 - q) * resid))
+        weighted = X * weights[:, None]
+        new_beta = np.linalg.solve(weighted.T @ X, weighted.T @ y)
+        if np.max(np.abs(new_beta - beta)) < tol:
+            return new_beta, iteration
+        beta = new_beta
+    return beta, max_iter
@@ -0,0 +1,140 @@
+import os
+import csv
+import logging
+import argparse
+
+from channel import RAW_CSV, BAND_QUANTILES, fit_quantile, load_prices
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+INPUT_CSV = RAW_CSV           # The series the published chart is fitted on
+TABLE_PATH = "charts/fit_diagnostics.csv"
+GRID_STEP = 0.01            # Quantile grid spacing; the band quantiles are always included
+CHUNK_ROWS = 2048           # Rows per pass; memory is CHUNK_ROWS x quantiles x 8 bytes per array
+TABLE_COLUMNS = ["run_date", "rows", "quantile", "intercept", "slope",
+                 "pinball", "pseudo_r2", "coverage", "crossings", "mse"]
+
+
+def quantile_grid(step=GRID_STEP):
+    """Sorted quantiles step, 2*step, ... below 1, plus the chart's band quantiles."""
+    import numpy as np
+    grid = np.round(np.arange(step, 1.0 - step / 2, step), 6)
+    return np.unique(np.concatenate([grid, BAND_QUANTILES]))
+
+
+def fit_grid(x, y, quantiles):
+    """Coefficients (intercept, slope) for every quantile; each fit starts from its neighbour's."""
+    import numpy as np
+
+    params = np.empty((len(quantiles), 2))
+    start = None
+    for i, q in enumerate(quantiles):
+        params[i], _ = fit_quantile(x, y, q, start=start)
+        start = params[i]
+    return params
+
+
+def goodness_of_fit(x, y, quantiles, params, chunk_rows=CHUNK_ROWS):
+    """
+    Fit diagnostics for every (quantile, intercept, slope) row of params in one vectorized pass.
+
+    x and y are ln(days since genesis) and ln(price); quantiles must be sorted ascending.
+    Returns arrays aligned with quantiles:
+    - pinball: mean check (pinball) loss
+    - pseudo_r2: Koenker-Machado pseudo R-squared, as statsmodels' QuantReg.prsquared
+    - coverage: fraction of days with the price below the fitted band
+    - crossings: days on which this band lies above the next higher quantile's band
+    - mse: mean squared error in log space
+    """
+    import numpy as np
+
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    quantiles = np.asarray(quantiles, dtype=float)
+    intercepts, slopes = params[:, 0], params[:, 1]
+    baseline = np.quantile(y, quantiles)  # Intercept-only model for the pseudo R-squared
+
+    loss = np.zeros(len(quantiles))
+    baseline_loss = np.zeros(len(quantiles))
+    below = np.zeros(len(quantiles))
+    squared = np.zeros(len(quantiles))
+    crossings = np.zeros(len(quantiles), dtype=np.int64)
+
+    for start in range(0, len(y), chunk_rows):
+        xc, yc = x[start:start + chunk_rows, None], y[start:start + chunk_rows, None]
+        predicted = intercepts + slopes * xc
+        resid = yc - predicted
+        loss += (resid * (quantiles - (resid < 0))).sum(axis=0)
+        base_resid = yc - baseline
+        baseline_loss += (base_resid * (quantiles - (base_resid < 0))).sum(axis=0)
+        below += (resid < 0).sum(axis=0)
+        squared += (resid ** 2).sum(axis=0)
+        crossings[:-1] += (predicted[:, :-1] > predicted[:, 1:]).sum(axis=0)
+
+    return {
+        "pinball": loss / len(y),
+        "pseudo_r2": 1 - loss / baseline_loss,
+        "coverage": below / len(y),
+        "crossings": crossings,
+        "mse": squared / len(y),
+    }
+
+
+def recorded_runs(table_path):
+    """run_date values already in the diagnostics table."""
+    if not os.path.exists(table_path):
+        return set()
+    with open(table_path, newline="") as f:
+        return {row["run_date"] for row in csv.DictReader(f)}
+
+
+def append_run(table_path, run_date, rows, quantiles, params, metrics):
+    """Append one run to the table (header written once); older runs are never rewritten."""
+    os.makedirs(os.path.dirname(table_path) or ".", exist_ok=True)
+    new_file = not os.path.exists(table_path)
+    with open(table_path, "a", newline="") as f:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(TABLE_COLUMNS)
+        for i, q in enumerate(quantiles):
+            writer.writerow([
+                run_date, rows, f"{q:g}", f"{params[i, 0]:.6f}", f"{params[i, 1]:.6f}",
+                f"{metrics['pinball'][i]:.6f}", f"{metrics['pseudo_r2'][i]:.6f}",
+                f"{metrics['coverage'][i]:.6f}", int(metrics["crossings"][i]), f"{metrics['mse'][i]:.6f}",
+            ])
+
+
+def run_diagnostics(input_csv=INPUT_CSV, table_path=TABLE_PATH, step=GRID_STEP, force=False):
+    """Fit the quantile grid on the latest data and add its diagnostics to the table once per as-of date."""
+    try:
+        import numpy as np
+
+        dates, ind, price = load_prices(input_csv)
+        run_date = str(dates[-1])
+        if not force and run_date in recorded_runs(table_path):
+            logging.info(f"Diagnostics for {run_date} already in {table_path}. Nothing to do.")
+            return None
+
+        x, y = np.log(ind), np.log(price)
+        quantiles = quantile_grid(step)
+        params = fit_grid(x, y, quantiles)
+        metrics = goodness_of_fit(x, y, quantiles, params)
+        append_run(table_path, run_date, len(y), quantiles, params, metrics)
+
+        worst = int(np.argmax(np.abs(metrics["coverage"] - quantiles)))
+        logging.info(f"Diagnostics for {run_date} ({len(quantiles)} quantiles) appended to {table_path}; "
+                     f"{int(metrics['crossings'].sum())} band crossings, largest coverage error "
+                     f"{metrics['coverage'][worst] - quantiles[worst]:+.4f} at q={quantiles[worst]:g}")
+        return metrics
+    except Exception as e:
+        logging.error(f"Diagnostics failed: {str(e)}")
+        raise
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Goodness-of-fit diagnostics for the whole quantile grid.")
+    parser.add_argument("--input", default=INPUT_CSV, help=f"Price CSV (default: {INPUT_CSV}).")
+    parser.add_argument("--table", default=TABLE_PATH, help=f"Diagnostics table to append to (default: {TABLE_PATH}).")
+    parser.add_argument("--step", type=float, default=GRID_STEP, help=f"Quantile grid step (default: {GRID_STEP}).")
+    parser.add_argument("--force", action="store_true", help="Append even if this as-of date is already recorded.")
+    args = parser.parse_args()
+    run_diagnostics(args.input, args.table, args.step, args.force)
@@ -1,38 +1,22 @@
-import pandas as pd
-from coinmetrics.api_client import CoinMetricsClient
-from datetime import datetime
+import os
+import sys
 import logging
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def extract_data():
-    try:
-        # Initialize Coin Metrics client
-        client = CoinMetricsClient()
-        
-        # Define parameters
-        asset = "btc"
-        metric = "PriceUSD"
-        frequency = "1d"
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts")
 
-        logging.info(f"Fetching BTC/USD price data")
-        metrics = client.get_asset_metrics(
-            assets=asset,
-            metrics=metric,
-            frequency=frequency,
-        )
-        data = pd.DataFrame(metrics)
 
-        # Ensure correct column format
-        data['time'] = pd.to_datetime(data['time'])
-        data['asset'] = asset
-        data['PriceUSD'] = pd.to_numeric(data['PriceUSD'], errors='coerce')
-        data = data[['time', 'asset', 'PriceUSD']]
-        data = data.sort_values('time')
+def extract_data():
+    """Build raw_btc_usd.csv through the cached ingestion orchestrator (source "btc_raw")."""
+    try:
+        sys.path.insert(0, SCRIPTS_DIR)
+        from ingest import run_sources
 
-        # Save raw data
-        data.to_csv("raw_btc_usd.csv", index=False)
-        logging.info(f"Extracted {len(data)} records to raw_btc_usd.csv")
+        logging.info("Fetching BTC/USD price data")
+        if not run_sources(["btc_raw"]):
+            raise RuntimeError("BTC/USD ingestion failed, see the log above")
+        logging.info("Extracted BTC/USD history to raw_btc_usd.csv")
     except Exception as e:
         logging.error(f"Extraction failed: {str(e)}")
         raise
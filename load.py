@@ -1,23 +1,207 @@
 import os
-import shutil
+import glob
+import gzip
+import json
+import hashlib
 import logging
+import argparse
+
+try:
+    import brotli
+except ImportError:  # Optional: only a gzip variant of plotly.js is written without it
+    brotli = None
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def load_data():
+FIGURE_JSON = "btc_usd_chart.json"
+LEGACY_JPG_NAME = "btc_usd_chart.jpg"  # No longer published; the workflows pass it on as an artifact
+CHARTS_DIR = "charts"
+SHELL_NAME = "btc_usd_chart.html"
+MANIFEST_NAME = "manifest.json"
+HASH_LENGTH = 12
+COMPRESSED_SUFFIXES = (".gz", ".br")
+
+SHELL_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Power Law Probability Channel</title>
+<style>html, body {{ margin: 0; height: 100%; background-color: rgb(17,17,17); }} #chart {{ width: 100%; height: 100%; }}</style>
+<script src="{plotly_js}"></script>
+</head>
+<body>
+<div id="chart"></div>
+<script>
+const DAY = 24 * 60 * 60 * 1000;
+fetch("{data}")
+  .then(response => response.json())
+  .then(chart => {{
+    // Band curves are price = exp(intercept + slope * ln(days since genesis)) over history plus forecast
+    const channel = chart.channel;
+    const dates = chart.prices.map(row => row[0]);
+    const days = dates.map((_, i) => channel.first_ind + i);
+    const bandDates = dates.slice();
+    const genesis = Date.parse(channel.genesis);
+    const last = Date.parse(dates[dates.length - 1]);
+    for (let k = 1; k <= channel.forecast_days; k++) {{
+      bandDates.push(new Date(last + k * DAY).toISOString().slice(0, 10));
+      days.push(Math.round((last + k * DAY - genesis) / DAY));
+    }}
+    for (const trace of chart.data) {{
+      if (trace.meta === "price") {{
+        trace.x = dates;
+        trace.y = chart.prices.map(row => row[1]);
+      }} else {{
+        const [intercept, slope] = channel.bands[trace.meta];
+        trace.x = bandDates;
+        trace.y = days.map(d => Math.exp(intercept + slope * Math.log(d)));
+      }}
+    }}
+    Plotly.newPlot("chart", chart.data, chart.layout, Object.assign({{responsive: true}}, chart.config));
+  }});
+</script>
+</body>
+</html>
+"""
+
+
+def content_hash(data):
+    """Short hex SHA-256 used in content-addressed file names."""
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def write_if_changed(path, data):
+    """Write bytes to path unless the file already holds exactly those bytes. Returns True if written."""
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return True
+
+
+def write_compressed_variants(path, data):
+    """Write .gz (and .br when brotli is installed) next to path. Output is deterministic (mtime=0)."""
+    changed = write_if_changed(f"{path}.gz", gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        changed |= write_if_changed(f"{path}.br", brotli.compress(data, quality=11))
+    return changed
+
+
+def remove_compressed_variants(path):
+    """Remove .gz/.br variants written next to path by earlier versions. Returns True if any existed."""
+    changed = False
+    for compressed_suffix in COMPRESSED_SUFFIXES:
+        if os.path.exists(path + compressed_suffix):
+            os.remove(path + compressed_suffix)
+            changed = True
+    return changed
+
+
+def publish_hashed(site_dir, family, stem, suffix, data, manifest, compress=False):
+    """
+    Publish data as charts/<stem>.<hash><suffix> and record it in the manifest under family.
+
+    Files of the same family (e.g. every data/btc_usd_chart*.json) are pruned except the
+    current and previous version, so a browser still holding yesterday's shell can load
+    its data. Only immutable artifacts should be compressed: compressed blobs of changing
+    data do not delta in git. Returns (path relative to charts/, changed).
+    """
+    relative_path = f"{stem}.{content_hash(data)}{suffix}"
+    path = os.path.join(site_dir, CHARTS_DIR, relative_path)
+
+    changed = write_if_changed(path, data)
+    if compress:
+        changed |= write_compressed_variants(path, data)
+
+    logical_name = f"{family}{suffix}"
+    entry = manifest.get(logical_name, {})
+    if entry.get("path") != relative_path:
+        manifest[logical_name] = {"path": relative_path, "previous": entry.get("path")}
+    keep = {manifest[logical_name]["path"], manifest[logical_name]["previous"]} - {None}
+    if compress:
+        keep |= {kept + compressed_suffix for kept in keep for compressed_suffix in COMPRESSED_SUFFIXES}
+
+    charts_dir = os.path.join(site_dir, CHARTS_DIR)
+    for existing in glob.glob(os.path.join(charts_dir, f"{family}*{suffix}*")):
+        existing_relative = os.path.relpath(existing, charts_dir).replace(os.sep, "/")
+        if existing_relative not in keep:
+            os.remove(existing)
+            changed = True
+            logging.info(f"Pruned stale artifact {existing_relative}")
+
+    return relative_path, changed
+
+
+def plotly_js_asset():
+    """Return (version, source) of the plotly.js bundle shipped with the installed plotly package."""
+    from plotly.offline import get_plotlyjs, get_plotlyjs_version
+    return get_plotlyjs_version(), get_plotlyjs().encode("utf-8")
+
+
+def load_data(site_dir=".", figure_json=FIGURE_JSON):
+    """
+    Publish the chart into site_dir (normally a gh-pages worktree) as delta-friendly artifacts:
+
+    - charts/assets/plotly-<version>.<hash>.min.js  shared plotly.js, written once per version
+    - charts/data/btc_usd_chart.<hash>.json          price rows, band coefficients, layout and config
+    - charts/btc_usd_chart.html                      small shell loading the two above and drawing the bands
+
+    Only the immutable plotly.js asset gets pre-compressed .gz/.br variants; GitHub Pages
+    compresses the rest on the fly. The JPG for X is not published, so a new image does not
+    add to the gh-pages history every day. Returns True if anything in site_dir changed.
+    """
     try:
-        # Create charts directory if it doesn't exist
-        os.makedirs("charts", exist_ok=True)
-        
-        # Define destination path (fixed filename, no date)
-        destination = "charts/btc_usd_chart.html"
-        
-        # Move btc_usd_chart.html to charts/, overwriting if exists
-        shutil.move("btc_usd_chart.html", destination)
-        logging.info(f"Moved chart to {destination} for commit to gh-pages branch")
+        charts_dir = os.path.join(site_dir, CHARTS_DIR)
+        os.makedirs(charts_dir, exist_ok=True)
+
+        manifest_path = os.path.join(charts_dir, MANIFEST_NAME)
+        manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+
+        version, plotly_js = plotly_js_asset()
+        plotly_js_path, changed = publish_hashed(
+            site_dir, "assets/plotly", f"assets/plotly-{version}", ".min.js", plotly_js, manifest, compress=True)
+
+        # Published byte for byte: transform.py writes one price row per line so daily versions delta well
+        with open(figure_json, "rb") as f:
+            chart_bytes = f.read()
+        data_path, data_changed = publish_hashed(
+            site_dir, "data/btc_usd_chart", "data/btc_usd_chart", ".json", chart_bytes, manifest)
+        changed |= data_changed
+        logging.info(f"Chart data published as {data_path} ({len(chart_bytes):,} bytes)")
+
+        shell = SHELL_TEMPLATE.format(plotly_js=plotly_js_path, data=data_path).encode("utf-8")
+        shell_path = os.path.join(charts_dir, SHELL_NAME)
+        changed |= write_if_changed(shell_path, shell)
+        changed |= remove_compressed_variants(shell_path)
+
+        legacy_jpg = os.path.join(charts_dir, LEGACY_JPG_NAME)
+        if os.path.exists(legacy_jpg):
+            os.remove(legacy_jpg)
+            changed = True
+            logging.info(f"Removed {legacy_jpg}; the image is passed to X posting as a workflow artifact")
+        manifest.pop(LEGACY_JPG_NAME, None)
+
+        manifest_bytes = (json.dumps(manifest, indent=2, sort_keys=True) + "\n").encode("utf-8")
+        changed |= write_if_changed(manifest_path, manifest_bytes)
+
+        if changed:
+            logging.info(f"Published chart artifacts to {charts_dir} for commit to gh-pages branch")
+        else:
+            logging.info("Chart artifacts unchanged. Nothing to publish.")
+        return changed
     except Exception as e:
         logging.error(f"Load failed: {str(e)}")
         raise
 
+
 if __name__ == "__main__":
-    load_data()
+    parser = argparse.ArgumentParser(description="Publish chart artifacts into a gh-pages checkout.")
+    parser.add_argument("--site", default=".", help="Root of the gh-pages worktree (default: current directory).")
+    args = parser.parse_args()
+    load_data(site_dir=args.site)
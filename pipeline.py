@@ -0,0 +1,42 @@
+import sys
+import runpy
+import argparse
+from pathlib import Path
+
+# Stage name -> (script, description). Scripts are only imported when their stage runs,
+# so `--help` and no-op runs never pay for pandas, statsmodels or plotly.
+STAGES = {
+    "ingest": ("scripts/ingest.py", "Update every price store concurrently through the HTTP cache"),
+    "update-btc": ("scripts/update_btc_price_coinmetrics.py", "Append new CoinMetrics BTC prices to data/BTC_Prices.csv"),
+    "update-gold": ("scripts/update_gold_price_MetalsDev.py", "Append new LBMA Gold PM prices from metals.dev"),
+    "validate": ("scripts/validate_prices.py", "Check the price stores for gaps, duplicates and bad values"),
+    "extract": ("extract.py", "Build raw_btc_usd.csv from the cached CoinMetrics history"),
+    "transform": ("transform.py", "Fit the power law quantile channel and render the chart"),
+    "diagnostics": ("diagnostics.py", "Append goodness-of-fit diagnostics for the whole quantile grid"),
+    "batch-render": ("batch_render.py", "Render the channel as it looked at many past as-of dates"),
+    "load": ("load.py", "Publish chart artifacts into a gh-pages checkout"),
+    "post": ("post_to_x.py", "Post the chart to X, resuming any unfinished post"),
+}
+
+ROOT = Path(__file__).resolve().parent
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run one stage of the BTC/USD ETL pipeline.",
+        epilog="stages:\n" + "\n".join(f"  {name:<12} {description}" for name, (_, description) in STAGES.items())
+               + "\n\nArguments after the stage are passed to it, e.g. `pipeline.py transform --force`.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("stage", choices=list(STAGES), metavar="stage")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    script = ROOT / STAGES[args.stage][0]
+    sys.argv = [str(script)] + args.args
+    sys.path.insert(0, str(script.parent))  # As `python <script>` does, so scripts/ can import ingest
+    runpy.run_path(str(script), run_name="__main__")
+
+
+if __name__ == "__main__":
+    main()
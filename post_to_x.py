@@ -1,91 +1,283 @@
-import tweepy
 import os
+import json
+import hashlib
+import random
 import logging
 import time
-import datetime
+import argparse
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def post_to_x():
+JPG_PATH = "charts/btc_usd_chart.jpg"
+STATE_PATH = "charts/x_post_state.json"
+CAPTION = "Daily BTC/USD Power Law Probability Channel Chart #Bitcoin"
+MEDIA_TYPE = "image/jpeg"
+MEDIA_CATEGORY = "tweet_image"
+
+CHUNK_SIZE = 1024 * 1024                # 1 MB per APPEND segment (X allows up to 5 MB)
+MAX_RETRY_DURATION = 5 * 60 * 60        # Give up 5 hours after the first attempt
+MAX_ATTEMPTS_PER_RUN = 4                # Attempts before handing over to the next scheduled run
+MAX_WAIT_PER_RUN = 10 * 60              # Never sleep longer than this inside a single run
+BACKOFF_BASE = 30                       # Seconds; doubled on every failed attempt
+BACKOFF_CAP = 30 * 60                   # Upper bound for a single backoff delay
+MEDIA_EXPIRY_MARGIN = 10 * 60           # Re-upload when the media_id is this close to expiring
+DEFAULT_MEDIA_TTL = 24 * 60 * 60        # Used when X does not report expires_after_secs
+
+
+def file_sha256(path):
+    """Return the hex SHA-256 digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def new_state(image_sha256, now):
+    """Fresh posting state for a chart image that has not been posted yet."""
+    return {
+        "image_sha256": image_sha256,
+        "first_attempt_at": now,
+        "attempts": 0,
+        "next_attempt_at": 0,
+        "last_error": None,
+        "media_id": None,
+        "segment_index": 0,
+        "finalized": False,
+        "expires_at": None,
+        "tweet_id": None,
+        "gave_up": False,
+    }
+
+
+def load_state(path=STATE_PATH):
+    """Load the posting state file, or None if there is none."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logging.info(f"Ignoring unreadable post state {path}: {e}")
+        return None
+
+
+def save_state(state, path=STATE_PATH):
+    """Write the posting state atomically so an interrupted run never leaves a torn file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP, rng=random):
+    """Exponential backoff with full jitter: uniform(0, min(cap, base * 2**attempt))."""
+    return rng.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def is_retryable(error):
+    """Rate limits, X server errors and transport failures are retried; other API errors are not."""
+    import tweepy
+
+    if isinstance(error, (tweepy.TooManyRequests, tweepy.TwitterServerError)):
+        return True
+    if isinstance(error, tweepy.HTTPException):
+        return False
+    return not isinstance(error, (FileNotFoundError, ValueError))
+
+
+def rate_limit_reset(error):
+    """Epoch seconds at which a 429 rate limit window resets, if X told us."""
+    response = getattr(error, "response", None)
+    if getattr(response, "status_code", None) != 429:
+        return None
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers["x-rate-limit-reset"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def give_up_if_expired(state, now, state_path=STATE_PATH):
+    """
+    Raise TimeoutError once the retry window has passed.
+
+    The state is marked as given up first, so later resume runs skip it without
+    calling X and the resume workflow does not even set up Python for it.
+    """
+    if now - state["first_attempt_at"] < MAX_RETRY_DURATION:
+        return
+    state["gave_up"] = True
+    save_state(state, state_path)
+    raise TimeoutError(f"Operation failed after {MAX_RETRY_DURATION / 3600} hours: {state['last_error']}")
+
+
+def create_clients():
+    """Build the v1.1 API (media upload) and v2 Client (tweets) once, verifying credentials once."""
+    import tweepy
+
+    api_key = os.getenv('X_API_KEY')
+    api_secret = os.getenv('X_API_SECRET')
+    access_token = os.getenv('X_ACCESS_TOKEN')
+    access_token_secret = os.getenv('X_ACCESS_TOKEN_SECRET')
+
+    auth = tweepy.OAuth1UserHandler(api_key, api_secret, access_token, access_token_secret)
+    # Rate limits are handled by the backoff below instead of sleeping inside tweepy
+    api = tweepy.API(auth, wait_on_rate_limit=False)
+    api.verify_credentials()
+    logging.info("X API authentication successful!")
+
+    client = tweepy.Client(
+        consumer_key=api_key,
+        consumer_secret=api_secret,
+        access_token=access_token,
+        access_token_secret=access_token_secret)
+    return api, client
+
+
+def media_is_usable(state, now):
+    """True if the stored media_id can still be attached to a tweet (or resumed)."""
+    if state.get("media_id") is None:
+        return False
+    expires_at = state.get("expires_at")
+    return expires_at is None or now < expires_at - MEDIA_EXPIRY_MARGIN
+
+
+def upload_media(api, jpg_path, state, state_path=STATE_PATH, clock=time.time):
+    """
+    Chunked, resumable upload of the chart image (INIT / APPEND / FINALIZE).
+
+    Progress is saved to the state file after every segment, so a failed run resumes
+    at the next segment and a finalized media_id is reused until it expires.
+    `api` is a tweepy.API or any fake exposing the same chunked_upload_* methods.
+    """
+    if state["finalized"] and media_is_usable(state, clock()):
+        logging.info(f"Reusing uploaded media ID: {state['media_id']}")
+        return state["media_id"]
+
+    if not media_is_usable(state, clock()):
+        if state.get("media_id") is not None:
+            logging.info(f"Media ID {state['media_id']} expired, uploading again")
+        total_bytes = os.path.getsize(jpg_path)
+        media = api.chunked_upload_init(total_bytes, MEDIA_TYPE, media_category=MEDIA_CATEGORY)
+        state.update(
+            media_id=media.media_id,
+            segment_index=0,
+            finalized=False,
+            expires_at=clock() + (getattr(media, "expires_after_secs", None) or DEFAULT_MEDIA_TTL),
+        )
+        save_state(state, state_path)
+        logging.info(f"Started chunked upload of {total_bytes} bytes, media ID: {media.media_id}")
+
+    with open(jpg_path, "rb") as f:
+        f.seek(state["segment_index"] * CHUNK_SIZE)
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            api.chunked_upload_append(state["media_id"], chunk, state["segment_index"])
+            state["segment_index"] += 1
+            save_state(state, state_path)
+
+    media = api.chunked_upload_finalize(state["media_id"])
+    expires_after_secs = getattr(media, "expires_after_secs", None)
+    if expires_after_secs:
+        state["expires_at"] = clock() + expires_after_secs
+    state["finalized"] = True
+    save_state(state, state_path)
+    logging.info(f"Media uploaded successfully in {state['segment_index']} segments, media ID: {state['media_id']}")
+    return state["media_id"]
+
+
+def post_to_x(jpg_path=JPG_PATH, state_path=STATE_PATH, resume_only=False,
+              clients=None, clock=time.time, sleep=time.sleep, rng=random):
+    """
+    Post the chart to X, or continue a post that an earlier run could not finish.
+
+    Returns True once the tweet exists and False when the attempt was deferred to a later
+    scheduled run (the state file records when) or was given up earlier. Raises TimeoutError
+    once the retry window has passed. `clients` is an (api, client) pair; pass fakes to
+    exercise this offline.
+    """
     try:
-        # Load X API credentials from environment variables
-        api_key = os.getenv('X_API_KEY')
-        api_secret = os.getenv('X_API_SECRET')
-        access_token = os.getenv('X_ACCESS_TOKEN')
-        access_token_secret = os.getenv('X_ACCESS_TOKEN_SECRET')
-        BEARER_TOKEN = os.getenv('X_BEARER_TOKEN')
-
-        # Authenticate with X API (v1.1)
-        def create_api():
-            auth = tweepy.OAuthHandler(api_key, api_secret)
-            auth.set_access_token(access_token, access_token_secret)
-            # Create API object
-            api = tweepy.API(auth, wait_on_rate_limit=True)
-            try:
-                api.verify_credentials()
-            except Exception as e:
-                logging.info("Error creating API")
-                print("Error creating API")
-                raise e
-            logging.info("API created")
-            print("API created")
-            return api
-
-        api = create_api()
-        
-        # Verify credentials
-        try:
-            api.verify_credentials()
-            logging.info("X API authentication successful!")
-        except Exception as e:
-            logging.info("X API authentication failed!")
-
-        jpg_path = "charts/btc_usd_chart.jpg"
         if not os.path.exists(jpg_path):
             raise FileNotFoundError(f"JPG file not found: {jpg_path}")
         logging.info(f"JPG file found: {jpg_path}")
 
-        MAX_RETRY_DURATION = 5 * 60 * 60  # 5 hours in seconds
-        RETRY_INTERVAL = 5 * 60           # 5 minutes in seconds
+        image_sha256 = file_sha256(jpg_path)
+        state = load_state(state_path)
+        if state is None or state.get("image_sha256") != image_sha256:
+            if resume_only:
+                logging.info("No pending post for the current chart. Nothing to resume.")
+                return True
+            state = new_state(image_sha256, clock())
+            save_state(state, state_path)
 
-        start_time = time.time()
+        if state["tweet_id"]:
+            logging.info(f"Chart already posted to X (tweet ID: {state['tweet_id']}). Nothing to do.")
+            return True
+
+        if state.get("gave_up"):
+            logging.info(f"Gave up posting this chart to X ({state['last_error']}). Nothing to do.")
+            return False
+
+        if clock() < state["next_attempt_at"]:
+            wait = state["next_attempt_at"] - clock()
+            logging.info(f"Next attempt is scheduled in {int(wait // 60)} minutes. Leaving it to a later run.")
+            return False
+
+        give_up_if_expired(state, clock(), state_path)
+        api, client = clients if clients is not None else create_clients()
+        run_started = clock()
+
+        for attempt in range(1, MAX_ATTEMPTS_PER_RUN + 1):
+            give_up_if_expired(state, clock(), state_path)
 
-        while True:
             try:
-                # Try to post the JPG Chart to X
                 logging.info("Trying to post the JPG Chart to X...")
-
-                # Example: raise an error for testing
-                # raise Exception("Simulated error")
-                
-                media = api.media_upload(filename=jpg_path)
-                media_id = media.media_id
-                logging.info(f"Media uploaded successfully, media ID: {media_id}")
-        
-                client = tweepy.Client(
-                    consumer_key=api_key,
-                    consumer_secret=api_secret,
-                    access_token=access_token,
-                    access_token_secret=access_token_secret)
-        
-                # Create a tweet
-                caption = "Daily BTC/USD Power Law Probability Channel Chart #Bitcoin"
-                client.create_tweet(text=caption, media_ids=[media_id])
-                logging.info("Posted JPG chart to X successfully using v2 endpoint")
-                break
+                media_id = upload_media(api, jpg_path, state, state_path, clock)
+                response = client.create_tweet(text=CAPTION, media_ids=[media_id])
+                state["tweet_id"] = str(response.data["id"])
+                state["last_error"] = None
+                save_state(state, state_path)
+                logging.info(f"Posted JPG chart to X successfully using v2 endpoint (tweet ID: {state['tweet_id']})")
+                return True
             except Exception as e:
-                elapsed = time.time() - start_time
-                if elapsed >= MAX_RETRY_DURATION:
-                    raise TimeoutError(f"Operation failed after {MAX_RETRY_DURATION/3600} hours") from e
-        
-                logging.info(f"[{datetime.datetime.now()}] Error: {e}")
-                minutes_left = int((MAX_RETRY_DURATION - elapsed) // 60)
-                logging.info(f"Retrying in {RETRY_INTERVAL // 60} minutes... {minutes_left} minutes left until giving up.")
-                time.sleep(RETRY_INTERVAL)
-    
+                if not is_retryable(e):
+                    # Retrying cannot fix this, so keep the scheduled resume runs from repeating it
+                    state["last_error"] = str(e)
+                    state["gave_up"] = True
+                    save_state(state, state_path)
+                    raise
+
+                delay = backoff_delay(state["attempts"], rng=rng)
+                reset_at = rate_limit_reset(e)
+                if reset_at is not None:
+                    delay = max(delay, reset_at - clock())
+                state["attempts"] += 1
+                state["last_error"] = str(e)
+                state["next_attempt_at"] = clock() + delay
+                save_state(state, state_path)
+                logging.info(f"Attempt {state['attempts']} failed: {e}")
+
+                if attempt == MAX_ATTEMPTS_PER_RUN or clock() + delay - run_started > MAX_WAIT_PER_RUN:
+                    break
+                logging.info(f"Retrying in {delay:.0f} seconds...")
+                sleep(delay)
+
+        minutes_left = int((MAX_RETRY_DURATION - (clock() - state["first_attempt_at"])) // 60)
+        logging.info(f"Deferred to the next scheduled run. {minutes_left} minutes left until giving up.")
+        return False
+
     except Exception as e:
         logging.error(f"Failed to post to X: {str(e)}")
         raise
 
+
 if __name__ == "__main__":
-    post_to_x()
+    parser = argparse.ArgumentParser(description="Post the daily chart to X, resuming any unfinished post.")
+    parser.add_argument("--resume-only", action="store_true",
+                        help="Only continue a pending post for the current chart; never start a new one.")
+    args = parser.parse_args()
+    post_to_x(resume_only=args.resume_only)
@@ -0,0 +1,451 @@
+from __future__ import annotations
+
+import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+from abc import ABC, abstractmethod
+from datetime import datetime, date, timedelta
+from pathlib import Path
+
+# === CONFIG ===
+CACHE_DIR = Path(os.getenv("INGEST_CACHE_DIR", ".cache/http"))
+CLOSED_WINDOW_TTL = 30 * 24 * 60 * 60   # Windows entirely in the past do not change
+REQUEST_TIMEOUT = 60
+
+
+def log(msg: str):
+    """Formatted UTC logging for GitHub Actions."""
+    print(f"[{datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}] {msg}", flush=True)
+
+
+def seconds_until_utc_midnight(now: float) -> float:
+    """TTL for windows that include today: fresh for the rest of the UTC day, so re-runs stay offline."""
+    midnight = datetime.utcfromtimestamp(now).replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    return (midnight - datetime.utcfromtimestamp(now)).total_seconds()
+
+
+class HttpCache:
+    """
+    On-disk response cache keyed by source, endpoint and date window.
+
+    Each entry is <key>.json (metadata: fetch time, TTL, ETag, Last-Modified) next to
+    <key>.body. Fresh entries are served without a request; stale ones are revalidated
+    with If-None-Match / If-Modified-Since and reused on 304 Not Modified.
+    """
+
+    def __init__(self, directory: Path = CACHE_DIR, clock=time.time):
+        self.directory = Path(directory)
+        self.clock = clock
+        self.hits = 0
+        self.revalidated = 0
+        self.fetches = 0
+
+    def key(self, source: str, endpoint: str, window: tuple, extra: str = "") -> str:
+        raw = json.dumps([source, endpoint, [str(d) for d in window], extra])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+    def _paths(self, key: str):
+        return self.directory / f"{key}.json", self.directory / f"{key}.body"
+
+    def load(self, key: str):
+        meta_path, body_path = self._paths(key)
+        if not meta_path.exists() or not body_path.exists():
+            return None, None
+        return json.loads(meta_path.read_text()), body_path.read_bytes()
+
+    def store(self, key: str, meta: dict, body: bytes):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        meta_path, body_path = self._paths(key)
+        body_path.write_bytes(body)
+        tmp_path = meta_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(meta, indent=2, sort_keys=True))
+        os.replace(tmp_path, meta_path)
+
+    def get(self, session, key: str, url: str, params: dict, ttl: float) -> bytes:
+        """Return the response body for url/params, from disk when possible. Blocking; run in a thread."""
+        meta, body = self.load(key)
+        now = self.clock()
+        if meta is not None and now - meta["fetched_at"] < meta["ttl"]:
+            self.hits += 1
+            return body
+
+        headers = {}
+        if meta is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        response = session.get(url, params=params, headers=headers, timeout=REQUEST_TIMEOUT)
+        if response.status_code == 304 and meta is not None:
+            self.revalidated += 1
+            meta.update(fetched_at=now, ttl=ttl)
+            self.store(key, meta, body)
+            return body
+        response.raise_for_status()
+
+        self.fetches += 1
+        meta = {
+            "url": url,
+            "fetched_at": now,
+            "ttl": ttl,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+        self.store(key, meta, response.content)
+        return response.content
+
+
+class RateLimiter:
+    """Spaces requests of one source at least `interval` seconds apart."""
+
+    def __init__(self, requests_per_second: float):
+        self.interval = 1.0 / requests_per_second
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self.lock:
+            loop = asyncio.get_running_loop()
+            delay = self.next_slot - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.next_slot = max(loop.time(), self.next_slot) + self.interval
+
+
+def last_csv_date(csv_path: Path, date_format: str) -> date | None:
+    """Date of the last row of a store, read from the file tail without loading pandas."""
+    if not csv_path.exists():
+        return None
+    with open(csv_path, "rb") as f:
+        f.seek(0, 2)
+        f.seek(max(0, f.tell() - 1024))
+        lines = [line for line in f.read().decode("utf-8").splitlines() if line.strip()]
+    try:
+        return datetime.strptime(lines[-1].split(",")[0], date_format).date()
+    except (IndexError, ValueError):
+        return None
+
+
+def calendar_windows(start: date, end: date, half_months: bool = False) -> list:
+    """
+    Split start..end into calendar-aligned windows (months, or halves of months).
+
+    Windows begin on the bucket start rather than on `start`, so the cache key of the current
+    bucket stays the same all day even after a run has appended rows to the store.
+    """
+    windows = []
+    while start <= end:
+        if half_months and start.day > 15:
+            bucket_start = start.replace(day=16)
+        else:
+            bucket_start = start.replace(day=1)
+        next_month = (bucket_start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        bucket_end = bucket_start.replace(day=15) if half_months and bucket_start.day == 1 else next_month - timedelta(days=1)
+        windows.append((bucket_start, min(bucket_end, end)))
+        start = bucket_end + timedelta(days=1)
+    return windows
+
+
+class Source(ABC):
+    """
+    One upstream price series and the local CSV store it feeds.
+
+    Subclasses describe which date windows to request and how to parse a response;
+    the orchestrator handles caching, rate limiting, concurrency and the merge.
+    """
+
+    name = ""
+    api = ""                  # Sources of the same API share cached responses and one rate limiter
+    csv_path: Path
+    date_format = "%Y-%m-%d"
+    requests_per_second = 1.0
+    first_date = date(2010, 7, 17)
+    seed_url = None           # Published copy of the store, used when the local CSV is missing
+    decimals = 2              # Rounding of newly fetched values; None keeps full precision
+    rebuild = False           # Rewrite the store from every window instead of appending new rows
+
+    @abstractmethod
+    def windows(self, last_date: date | None, today: date) -> list:
+        """Date windows to request after last_date (None when the store is empty or rebuilt)."""
+
+    @abstractmethod
+    async def fetch(self, orchestrator, window: tuple) -> list:
+        """Return [(date, value), ...] for one window."""
+
+    def finalize(self, df):
+        """Hook to post-process the merged store before it is written."""
+        return df
+
+    def write(self, df):
+        """Write the merged Date/Value frame in the store's format."""
+        df = df.copy()
+        df["Date"] = df["Date"].dt.strftime(self.date_format)
+        self.csv_path.parent.mkdir(parents=True, exist_ok=True)
+        df.to_csv(self.csv_path, index=False)
+        return df["Date"].iloc[-1]
+
+
+class CoinMetricsSource(Source):
+    """BTC PriceUSD from the CoinMetrics community API, appended to data/BTC_Prices.csv."""
+
+    name = "btc"
+    api = "coinmetrics"
+    csv_path = Path("data/BTC_Prices.csv")
+    date_format = "%d/%m/%Y"
+    requests_per_second = 10 / 6  # Community API: 10 requests per 6 seconds
+    base_url = os.getenv("COINMETRICS_API_URL", "https://community-api.coinmetrics.io/v4")
+    endpoint = "/timeseries/asset-metrics"
+    seed_url = "https://raw.githubusercontent.com/carlosmassa/btc-etl-pipeline/main/data/BTC_Prices.csv"
+
+    def windows(self, last_date, today):
+        start = self.first_date if last_date is None else last_date + timedelta(days=1)
+        return calendar_windows(start, today)
+
+    async def fetch(self, orchestrator, window):
+        start, end = window
+        params = {"assets": "btc", "metrics": "PriceUSD", "frequency": "1d", "page_size": 10000,
+                  "start_time": start.isoformat(), "end_time": end.isoformat()}
+        rows, page_token = [], None
+        while True:
+            page_params = dict(params, next_page_token=page_token) if page_token else params
+            body = await orchestrator.get(self, self.endpoint, window, page_params, extra=page_token or "")
+            payload = json.loads(body)
+            for item in payload.get("data", []):
+                if item.get("PriceUSD") is not None:
+                    rows.append((datetime.fromisoformat(item["time"][:10]).date(), float(item["PriceUSD"])))
+            page_token = payload.get("next_page_token")
+            if not page_token:
+                return rows
+
+
+class CoinMetricsRawSource(CoinMetricsSource):
+    """
+    Full-precision BTC PriceUSD history in raw_btc_usd.csv, the input of transform.py.
+
+    Rebuilt from every monthly window on each run. The windows are the same requests the
+    btc store makes, so both read the same cached responses: settled months come from the
+    cache and the current month is fetched at most once a day for both.
+    """
+
+    name = "btc_raw"
+    csv_path = Path("raw_btc_usd.csv")
+    seed_url = None
+    decimals = None
+    rebuild = True
+
+    def windows(self, last_date, today):
+        return calendar_windows(self.first_date, today)
+
+    def write(self, df):
+        import pandas as pd
+        out = pd.DataFrame({"time": df["Date"].dt.tz_localize("UTC"), "asset": "btc", "PriceUSD": df["Value"]})
+        out.to_csv(self.csv_path, index=False)
+        return df["Date"].iloc[-1].strftime("%Y-%m-%d")
+
+
+class MetalsDevSource(Source):
+    """LBMA Gold PM USD from metals.dev, appended to data/LBMA-gold_D-gold_D_USD_PM.csv."""
+
+    name = "gold"
+    api = "metals.dev"
+    csv_path = Path("data/LBMA-gold_D-gold_D_USD_PM.csv")
+    requests_per_second = 1.0
+    # The LBMA PM series starts here; a missing store is normally restored from seed_url instead
+    first_date = date(1968, 1, 2)
+    base_url = os.getenv("METALS_DEV_API_URL", "https://api.metals.dev/v1")
+    endpoint = "/timeseries"
+    symbol = "lbma_gold_pm"
+    seed_url = "https://raw.githubusercontent.com/carlosmassa/btc-etl-pipeline/main/data/LBMA-gold_D-gold_D_USD_PM.csv"
+
+    def windows(self, last_date, today):
+        # The PM fix of today is not final yet; only request completed days
+        start = self.first_date if last_date is None else last_date + timedelta(days=1)
+        # Half-month windows stay within the API's 30 day limit
+        return calendar_windows(start, today - timedelta(days=1), half_months=True)
+
+    async def fetch(self, orchestrator, window):
+        api_key = os.getenv("METALS_DEV_API_KEY")
+        if not api_key:
+            raise ValueError("❌ METALS_DEV_API_KEY environment variable not found. Set it before running.")
+        start, end = window
+        params = {"api_key": api_key, "symbols": self.symbol,
+                  "start_date": start.isoformat(), "end_date": end.isoformat()}
+        # The API key is deliberately left out of the cache key
+        body = await orchestrator.get(self, self.endpoint, window, params, extra=self.symbol)
+        payload = json.loads(body)
+        return [
+            (datetime.fromisoformat(day).date(), float(day_data["metals"]["gold"]))
+            for day, day_data in payload.get("rates", {}).items()
+            if "gold" in day_data.get("metals", {})
+        ]
+
+    def finalize(self, df):
+        # Carry Friday's fix over weekends and holidays
+        import pandas as pd
+        full_dates = pd.DataFrame({"Date": pd.date_range(df["Date"].min(), df["Date"].max(), freq="D")})
+        df = full_dates.merge(df, on="Date", how="left")
+        df["Value"] = df["Value"].ffill()
+        return df
+
+
+SOURCES = [CoinMetricsSource(), MetalsDevSource(), CoinMetricsRawSource()]
+
+
+class Orchestrator:
+    """Runs every registered source concurrently through the shared cache."""
+
+    def __init__(self, sources=None, cache: HttpCache | None = None, today: date | None = None):
+        self.sources = sources if sources is not None else SOURCES
+        self.cache = cache or HttpCache()
+        self.today = today or datetime.utcnow().date()
+        self.limiters = {}
+        self.sessions = {}
+        self.inflight = {}
+
+    def _ttl(self, window: tuple) -> float:
+        # Windows reaching yesterday or today may still gain data; older ones are settled
+        if window and window[-1] < self.today - timedelta(days=1):
+            return CLOSED_WINDOW_TTL
+        return seconds_until_utc_midnight(self.cache.clock())
+
+    async def _fetch(self, api: str, key: str, url: str, params: dict, ttl: float, limiter=None) -> bytes:
+        """Serve one cache key, waiting for the rate limiter only when the network is needed."""
+        import requests
+
+        meta, _ = self.cache.load(key)
+        if limiter is not None and (meta is None or self.cache.clock() - meta["fetched_at"] >= meta["ttl"]):
+            await limiter.wait()
+        if api not in self.sessions:
+            self.sessions[api] = requests.Session()
+        session = self.sessions[api]
+        return await asyncio.to_thread(self.cache.get, session, key, url, params, ttl)
+
+    def _shared(self, key: str, make) -> asyncio.Future:
+        """One request per cache key per run, however many sources ask for it."""
+        if key not in self.inflight:
+            self.inflight[key] = asyncio.ensure_future(make())
+        return self.inflight[key]
+
+    async def get(self, source: Source, endpoint: str, window: tuple, params: dict, extra: str = "") -> bytes:
+        """Fetch one window of one source, rate limited per API; cache hits skip the limiter."""
+        api = source.api or source.name
+        key = self.cache.key(api, endpoint, window, extra)
+        limiter = self.limiters.setdefault(api, RateLimiter(source.requests_per_second))
+        url = source.base_url + endpoint
+        return await self._shared(key, lambda: self._fetch(api, key, url, params, self._ttl(window), limiter))
+
+    async def seed(self, source: Source) -> bool:
+        """Restore a missing store from its published copy. Returns False if that is unavailable."""
+        key = self.cache.key(source.name, "seed", (), source.seed_url)
+        try:
+            body = await self._shared(key, lambda: self._fetch("seed", key, source.seed_url, {}, self._ttl(())))
+        except Exception as e:
+            log(f"⚠️ {source.name}: could not fetch the published CSV: {e}")
+            return False
+        source.csv_path.parent.mkdir(parents=True, exist_ok=True)
+        source.csv_path.write_bytes(body)
+        log(f"✅ {source.name}: restored {source.csv_path} from {source.seed_url}.")
+        return True
+
+    async def update(self, source: Source) -> dict:
+        """Fetch all missing windows of a source concurrently and merge them into its store."""
+        if not source.rebuild and not source.csv_path.exists() and source.seed_url:
+            log(f"⚠️ {source.name}: {source.csv_path} not found locally. Trying the published copy...")
+            await self.seed(source)
+
+        last_date = None if source.rebuild else last_csv_date(source.csv_path, source.date_format)
+        windows = source.windows(last_date, self.today)
+        if not windows:
+            log(f"ℹ️ {source.name}: store already up to date (last date: {last_date}).")
+            return {"source": source.name, "added": 0}
+
+        results = await asyncio.gather(*(source.fetch(self, window) for window in windows))
+        rows = [row for result in results for row in result]
+        if not rows:
+            log(f"ℹ️ {source.name}: no new data for {windows[0][0]} → {windows[-1][1]}.")
+            return {"source": source.name, "added": 0}
+
+        import pandas as pd
+        df_new = pd.DataFrame(rows, columns=["Date", "Value"])
+        df_new["Date"] = pd.to_datetime(df_new["Date"])
+        if source.decimals is not None:
+            df_new["Value"] = df_new["Value"].round(source.decimals)
+        if source.csv_path.exists() and not source.rebuild:
+            df_existing = pd.read_csv(source.csv_path, dtype={"Date": str, "Value": float})
+            df_existing["Date"] = pd.to_datetime(df_existing["Date"], format=source.date_format)
+        else:
+            df_existing = pd.DataFrame({"Date": pd.Series(dtype="datetime64[ns]"), "Value": pd.Series(dtype=float)})
+
+        df_updated = (
+            pd.concat([df_existing, df_new])
+            .drop_duplicates(subset="Date")
+            .sort_values("Date")
+            .reset_index(drop=True)
+        )
+        df_updated = source.finalize(df_updated)
+        added = len(df_updated) - len(df_existing)
+        last_written = source.write(df_updated)
+        log(f"💾 {source.name}: {'wrote' if source.rebuild else 'added'} {added} rows, "
+            f"now {len(df_updated)} (last date: {last_written}).")
+        return {"source": source.name, "added": added}
+
+    async def run(self) -> list:
+        results = await asyncio.gather(*(self.update(source) for source in self.sources), return_exceptions=True)
+        for session in self.sessions.values():
+            session.close()
+        for source, result in zip(self.sources, results):
+            if isinstance(result, Exception):
+                log(f"❌ {source.name}: {result}")
+        return results
+
+
+def source_names() -> list:
+    return [source.name for source in SOURCES]
+
+
+def run_sources(names: list, cache: HttpCache | None = None, report: Path | None = None) -> bool:
+    """
+    Update the named sources in one orchestrated pass. Returns True if every source succeeded.
+
+    With `report`, the outcome of each source is also written there as JSON, so a workflow
+    can still validate and commit the stores that updated when another source failed.
+    """
+    sources = [source for source in SOURCES if source.name in names]
+    orchestrator = Orchestrator(sources, cache=cache)
+    results = asyncio.run(orchestrator.run())
+    cache = orchestrator.cache
+    log(f"📡 Network: {cache.fetches} fetched, {cache.revalidated} revalidated (304), {cache.hits} served from cache.")
+    ok = not any(isinstance(result, Exception) for result in results)
+    if report:
+        outcomes = {
+            source.name: {"ok": False, "error": str(result)} if isinstance(result, Exception)
+            else {"ok": True, "added": int(result["added"])}
+            for source, result in zip(sources, results)
+        }
+        Path(report).write_text(json.dumps({"ok": ok, "sources": outcomes}, indent=2) + "\n")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Update every price store in one concurrent, cached pass.")
+    parser.add_argument("sources", nargs="*", default=source_names(),
+                        help=f"Sources to update: {', '.join(source_names())} (default: all).")
+    parser.add_argument("--report", type=Path, help="Write each source's outcome to this JSON file.")
+    args = parser.parse_args()
+    unknown = sorted(set(args.sources) - set(source_names()))
+    if unknown:
+        parser.error(f"unknown source: {', '.join(unknown)}")
+
+    log("🚀 Starting price ingestion...")
+    if not run_sources(args.sources, report=args.report):
+        sys.exit(1)
+    log("🎉 Price ingestion completed successfully.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+import io
+import sys
+import json
+import zlib
+import argparse
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from pathlib import Path
+
+# === CONFIG ===
+INDEX_VERSION = 1
+READ_BLOCK = 1024 * 1024  # Block size when re-hashing the indexed bytes
+MAX_EXAMPLES = 10        # Offending rows listed per check in the report
+JUMP_Z_LIMIT = 8.0       # Log-return jumps beyond this many standard deviations are flagged
+
+SERIES = {
+    "btc": {
+        "csv": Path("data/BTC_Prices.csv"),
+        "date_column": "Date",
+        "value_column": "Value",
+        "date_format": "%d/%m/%Y",
+        "start_date": None,
+        "min_jump": 0.25,
+    },
+    "gold": {
+        "csv": Path("data/LBMA-gold_D-gold_D_USD_PM.csv"),
+        "date_column": "Date",
+        "value_column": "Value",
+        "date_format": "%Y-%m-%d",
+        "start_date": None,
+        "min_jump": 0.05,
+    },
+    # Output of extract.py, checked before transform.py fits the regression on it
+    "btc_raw": {
+        "csv": Path("raw_btc_usd.csv"),
+        "date_column": "time",
+        "value_column": "PriceUSD",
+        "date_format": "ISO8601",
+        "start_date": "2010-07-18",
+        "min_jump": 0.25,
+    },
+}
+
+
+def log(msg: str):
+    """Formatted UTC logging for GitHub Actions (stderr, so stdout stays machine-readable)."""
+    print(f"[{datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}] {msg}", file=sys.stderr, flush=True)
+
+
+def index_path(csv_path: Path) -> Path:
+    """Sidecar index stored next to the CSV, e.g. data/BTC_Prices.index.json."""
+    return csv_path.with_suffix(".index.json")
+
+
+def load_index(path: Path):
+    """Load a sidecar index, or None if it is missing or unreadable."""
+    if not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text())
+    except ValueError:
+        return None
+
+
+def prefix_crc32(csv_path: Path, length: int) -> int:
+    """CRC32 of the first `length` bytes of a file."""
+    crc = 0
+    with open(csv_path, "rb") as f:
+        while length > 0:
+            block = f.read(min(READ_BLOCK, length))
+            if not block:
+                break
+            crc = zlib.crc32(block, crc)
+            length -= len(block)
+    return crc
+
+
+def stale_reason(index, csv_path: Path, config: dict):
+    """Why the index cannot be trusted for an incremental check, or None if it can."""
+    if index is None:
+        return "index missing"
+    if index.get("version") != INDEX_VERSION:
+        return "index version changed"
+    if index.get("date_format") != config["date_format"] or index.get("start_date") != config["start_date"]:
+        return "series config changed"
+    offset = index["offset"]
+    if csv_path.stat().st_size < offset:
+        return "file shrank"
+    # The stores are a few hundred KB, so re-hashing every indexed byte is cheap next to parsing them
+    if prefix_crc32(csv_path, offset) != index["crc32"]:
+        return "indexed rows were rewritten"
+    return None
+
+
+def parse_rows(raw: bytes, columns: list, config: dict) -> pd.DataFrame:
+    """Parse CSV bytes (without header) into Date/Value columns; unparseable cells become NaT/NaN."""
+    if not raw.strip():
+        return pd.DataFrame({"Date": pd.Series(dtype="datetime64[ns]"), "Value": pd.Series(dtype=float),
+                             "Raw": pd.Series(dtype=str)})
+    df = pd.read_csv(io.BytesIO(raw), header=None, names=columns, dtype=str, skip_blank_lines=True)
+    dates = pd.to_datetime(df[config["date_column"]], format=config["date_format"], errors="coerce", utc=True)
+    rows = pd.DataFrame({
+        "Date": dates.dt.tz_localize(None).dt.normalize(),
+        "Value": pd.to_numeric(df[config["value_column"]], errors="coerce"),
+        "Raw": df[config["date_column"]],
+    })
+    if config["start_date"]:
+        rows = rows[~(rows["Date"] < pd.Timestamp(config["start_date"]))]
+    return rows.reset_index(drop=True)
+
+
+def merge_stats(stats: dict, returns: np.ndarray) -> dict:
+    """Combine running log-return statistics with a new batch (parallel Welford update)."""
+    n_b = len(returns)
+    if n_b == 0:
+        return stats
+    mean_b = float(returns.mean())
+    m2_b = float(((returns - mean_b) ** 2).sum())
+    n_a, mean_a, m2_a = stats["count"], stats["mean"], stats["m2"]
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    return {
+        "count": n,
+        "mean": mean_a + delta * n_b / n,
+        "m2": m2_a + m2_b + delta ** 2 * n_a * n_b / n,
+    }
+
+
+def finding(check: str, rows: pd.DataFrame, detail: str) -> dict:
+    """One report entry with a count and a few example rows."""
+    examples = [
+        {"date": raw, "value": None if pd.isna(value) else float(value)}
+        for raw, value in zip(rows["Raw"].head(MAX_EXAMPLES), rows["Value"].head(MAX_EXAMPLES))
+    ]
+    return {"check": check, "count": int(len(rows)), "detail": detail, "examples": examples}
+
+
+def check_rows(rows: pd.DataFrame, previous, stats: dict, config: dict, new_rows: bool = False):
+    """
+    Vectorized checks of rows against each other and against the last indexed row.
+
+    Date order is checked on every row with a parseable date, jumps on the valid rows only.
+    A jump is an error when `new_rows` (rows appended since the index) and a warning in a
+    full scan of the history. Returns (errors, warnings, log returns of the valid rows).
+    """
+    errors, warnings = [], []
+
+    bad_date = rows["Date"].isna()
+    if bad_date.any():
+        errors.append(finding("unparseable_date", rows[bad_date], f"expected {config['date_format']}"))
+    bad_value = rows["Value"].isna()
+    if bad_value.any():
+        errors.append(finding("missing_value", rows[bad_value], "value is empty or not numeric"))
+    non_positive = rows["Value"] <= 0
+    if non_positive.any():
+        errors.append(finding("non_positive_value", rows[non_positive], "prices must be > 0"))
+
+    # A row dropped for a bad value still holds its date, so order is checked before dropping it
+    dated = rows[~bad_date].reset_index(drop=True)
+    dates = dated["Date"]
+    if previous is not None:
+        dates = pd.concat([pd.Series([pd.Timestamp(previous["date"])]), dates], ignore_index=True)
+    step = dates.diff().dt.days.to_numpy()[1:]
+    checked = dated if previous is not None else dated.iloc[1:].reset_index(drop=True)
+    if (step == 0).any():
+        errors.append(finding("duplicate_date", checked[step == 0], "date repeats the previous row"))
+    if (step < 0).any():
+        errors.append(finding("out_of_order", checked[step < 0], "date is before the previous row"))
+    if (step > 1).any():
+        errors.append(finding("gap", checked[step > 1], "days missing before this row"))
+
+    valid = rows[~bad_date & ~bad_value & ~non_positive].reset_index(drop=True)
+    values = valid["Value"].to_numpy(dtype=float)
+    if previous is not None:
+        values = np.concatenate([[previous["value"]], values])
+    jumped = valid if previous is not None else valid.iloc[1:].reset_index(drop=True)
+
+    returns = np.diff(np.log(values)) if len(values) > 1 else np.array([])
+    reference = stats if stats["count"] > 1 else merge_stats(stats, returns)
+    if reference["count"] > 1 and len(returns):
+        std = np.sqrt(reference["m2"] / (reference["count"] - 1))
+        jumps = (np.abs(returns - reference["mean"]) > JUMP_Z_LIMIT * std) & (np.abs(returns) > config["min_jump"])
+        if jumps.any():
+            # A jump in new rows would go straight into the regression, so it blocks the commit
+            (errors if new_rows else warnings).append(finding(
+                "outlier_jump", jumped[jumps],
+                f"|log return| beyond {JUMP_Z_LIMIT:g} std ({JUMP_Z_LIMIT * std:.3f}) and {config['min_jump']}"))
+
+    return errors, warnings, returns
+
+
+def validate_series(name: str, full: bool = False) -> dict:
+    """Validate one series, incrementally when its index is fresh, and refresh the index if clean."""
+    config = SERIES[name]
+    csv_path = config["csv"]
+    report = {"series": name, "path": str(csv_path), "ok": False, "errors": [], "warnings": []}
+    if not csv_path.exists():
+        report["errors"].append({"check": "missing_file", "count": 1, "detail": "CSV not found", "examples": []})
+        return report
+
+    idx_path = index_path(csv_path)
+    index = load_index(idx_path)
+    reason = "full scan requested" if full else stale_reason(index, csv_path, config)
+
+    with open(csv_path, "rb") as f:
+        if reason is None:
+            report["mode"] = "incremental"
+            columns = index["columns"]
+            offset, crc, row_count = index["offset"], index["crc32"], index["rows"]
+            previous = {"date": index["last_date"], "value": index["last_value"]} if index["last_date"] else None
+            stats = index["stats"]
+            f.seek(offset)
+            new_bytes = f.read()
+        else:
+            report["mode"] = "full"
+            report["reason"] = reason
+            header = f.readline()
+            columns = header.decode("utf-8").strip().split(",")
+            offset, crc, row_count, previous = len(header), zlib.crc32(header), 0, None
+            stats = {"count": 0, "mean": 0.0, "m2": 0.0}
+            new_bytes = f.read()
+
+    rows = parse_rows(new_bytes, columns, config)
+    errors, warnings, returns = check_rows(rows, previous, stats, config, new_rows=reason is None)
+
+    report["rows_checked"] = int(len(rows))
+    report["rows_total"] = row_count + int(len(rows))
+    report["errors"], report["warnings"] = errors, warnings
+    report["ok"] = not errors
+    log(f"{'✅' if report['ok'] else '❌'} {name}: {report['mode']} check of {len(rows)} rows "
+        f"({len(errors)} errors, {len(warnings)} warnings){' - ' + reason if reason else ''}")
+
+    if not report["ok"]:
+        # Keep the old index so the offending rows are checked again next run
+        return report
+
+    end = offset + len(new_bytes)
+    last = rows.iloc[-1] if len(rows) else None
+    index = {
+        "version": INDEX_VERSION,
+        "date_format": config["date_format"],
+        "start_date": config["start_date"],
+        "columns": columns,
+        "offset": end,
+        "rows": report["rows_total"],
+        "crc32": zlib.crc32(new_bytes, crc),
+        "last_date": last["Date"].strftime("%Y-%m-%d") if last is not None else (previous or {}).get("date"),
+        "last_value": float(last["Value"]) if last is not None else (previous or {}).get("value"),
+        "stats": merge_stats(stats, returns),
+    }
+    idx_path.write_text(json.dumps(index, indent=2, sort_keys=True) + "\n")
+    report["last_date"] = index["last_date"]
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check price CSVs for gaps, duplicates, bad values and jumps.")
+    parser.add_argument("series", nargs="*", default=["btc", "gold"],
+                        help=f"Series to validate: {', '.join(sorted(SERIES))} (default: btc gold).")
+    parser.add_argument("--full", action="store_true", help="Ignore the sidecar indexes and rescan every row.")
+    parser.add_argument("--report", type=Path, help="Also write the JSON report to this path.")
+    args = parser.parse_args()
+    unknown = sorted(set(args.series) - set(SERIES))
+    if unknown:
+        parser.error(f"unknown series: {', '.join(unknown)}")
+
+    reports = [validate_series(name, full=args.full) for name in args.series]
+    summary = {"ok": all(r["ok"] for r in reports), "series": reports}
+    output = json.dumps(summary, indent=2)
+    print(output)
+    if args.report:
+        args.report.write_text(output + "\n")
+    if not summary["ok"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import os
+import sys
+import json
+import hashlib
+import tempfile
+import functools
+import threading
+import unittest
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import ingest  # noqa: E402
+
+TODAY = date(2024, 3, 10)  # A Sunday
+GOLD_SEED = "Date,Value\n1968-01-02,35.18\n1968-01-03,35.16\n2024-02-29,2030.1\n2024-03-01,2050.5\n"
+
+
+def btc_price(day):
+    return 50000 + day.toordinal() % 97 + 0.123456
+
+
+def gold_price(day):
+    return 2000 + day.toordinal() % 13 + 0.25
+
+
+def days(start, end):
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """CoinMetrics, metals.dev and raw CSV endpoints with ETags and 304 Not Modified."""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        self.server.calls.append(url.path)
+
+        if url.path == "/cm/timeseries/asset-metrics":
+            window = days(date.fromisoformat(query["start_time"]), min(date.fromisoformat(query["end_time"]), TODAY))
+            body = json.dumps({"data": [{"asset": "btc", "time": f"{d.isoformat()}T00:00:00.000000000Z",
+                                         "PriceUSD": str(btc_price(d))} for d in window]})
+        elif url.path == "/metals/timeseries":
+            window = days(date.fromisoformat(query["start_date"]), date.fromisoformat(query["end_date"]))
+            body = json.dumps({"rates": {d.isoformat(): {"metals": {"gold": gold_price(d)}}
+                                         for d in window if d.weekday() < 5}})
+        elif url.path == "/seed/gold.csv":
+            body = GOLD_SEED
+        else:
+            self.send_error(404)
+            return
+
+        etag = '"' + hashlib.sha256(body.encode()).hexdigest()[:16] + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.server.not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+class IngestTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        cls.server.calls, cls.server.not_modified = [], 0
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.calls.clear()
+        self.server.not_modified = 0
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = Path(self.tmp.name)
+        self.now = datetime(2024, 3, 10, 3, 0, tzinfo=timezone.utc).timestamp()
+        env = mock.patch.dict(os.environ, {"METALS_DEV_API_KEY": "test-key"})
+        env.start()
+        self.addCleanup(env.stop)
+
+        pd.DataFrame({"Date": [d.strftime("%d/%m/%Y") for d in days(date(2024, 2, 20), date(2024, 2, 27))],
+                      "Value": 1.0}).to_csv(self.dir / "btc.csv", index=False)
+        pd.DataFrame({"Date": [d.isoformat() for d in days(date(2024, 2, 26), date(2024, 3, 1))],
+                      "Value": 2000.0}).to_csv(self.dir / "gold.csv", index=False)
+
+    def sources(self):
+        btc, gold, raw = ingest.CoinMetricsSource(), ingest.MetalsDevSource(), ingest.CoinMetricsRawSource()
+        btc.csv_path, gold.csv_path, raw.csv_path = self.dir / "btc.csv", self.dir / "gold.csv", self.dir / "raw.csv"
+        btc.base_url = raw.base_url = f"{self.url}/cm"
+        gold.base_url = f"{self.url}/metals"
+        gold.seed_url = f"{self.url}/seed/gold.csv"
+        btc.seed_url = None
+        raw.first_date = date(2024, 1, 1)  # Three monthly windows instead of the history since 2010
+        for source in (btc, gold, raw):
+            source.requests_per_second = 1000
+        return btc, gold, raw
+
+    def run_ingest(self, sources, today=TODAY):
+        cache = ingest.HttpCache(self.dir / "cache", clock=lambda: self.now)
+        orchestrator = ingest.Orchestrator(list(sources), cache=cache, today=today)
+        results = ingest.asyncio.run(orchestrator.run())
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return cache
+
+    def test_first_run_fetches_each_window_once(self):
+        btc, gold, raw = self.sources()
+        cache = self.run_ingest([btc, gold, raw])
+
+        # btc: Feb + Mar, shared with raw (Jan + Feb + Mar); gold: Mar 1-9
+        self.assertEqual(sorted(self.server.calls), ["/cm/timeseries/asset-metrics"] * 3 + ["/metals/timeseries"])
+        self.assertEqual(cache.fetches, 4)
+
+        stored = pd.read_csv(btc.csv_path)
+        self.assertEqual(stored["Date"].iloc[-1], "10/03/2024")
+        self.assertEqual(stored["Value"].iloc[-1], round(btc_price(TODAY), 2))
+        # Whole calendar months are requested; rows already in the store are kept as they are
+        self.assertEqual(len(stored), len(days(date(2024, 2, 1), TODAY)))
+        self.assertEqual(stored.set_index("Date").loc["27/02/2024", "Value"], 1.0)
+
+        raw_rows = pd.read_csv(raw.csv_path)
+        self.assertEqual(list(raw_rows.columns), ["time", "asset", "PriceUSD"])
+        self.assertEqual(raw_rows["time"].iloc[0], "2024-01-01 00:00:00+00:00")
+        self.assertEqual(raw_rows["PriceUSD"].iloc[-1], btc_price(TODAY))
+        self.assertEqual(len(raw_rows), len(days(date(2024, 1, 1), TODAY)))
+
+        gold_rows = pd.read_csv(gold.csv_path)
+        # Today's PM fix is not requested; Saturday has no fix, so the store ends on Friday
+        self.assertEqual(gold_rows["Date"].iloc[-1], "2024-03-08")
+        self.assertEqual(gold_rows["Value"].iloc[-1], round(gold_price(date(2024, 3, 8)), 2))
+        # The weekend before the new rows is carried over from Friday
+        self.assertEqual(gold_rows.set_index("Date").loc["2024-03-02", "Value"], 2000.0)
+
+    def test_same_day_rerun_makes_no_calls(self):
+        self.run_ingest(self.sources())
+        self.server.calls.clear()
+
+        self.now += 6 * 60 * 60
+        cache = self.run_ingest(self.sources())
+        self.assertEqual(self.server.calls, [])
+        self.assertEqual(cache.fetches + cache.revalidated, 0)
+        # btc is up to date; raw is rebuilt from its 3 cached windows and gold re-reads Mar 1-9
+        self.assertEqual(cache.hits, 4)
+
+    def test_expired_entries_are_revalidated_with_304(self):
+        self.run_ingest(self.sources())
+        self.server.calls.clear()
+
+        self.now += ingest.CLOSED_WINDOW_TTL + 1
+        _, _, raw = self.sources()
+        cache = self.run_ingest([raw])
+        self.assertEqual(len(self.server.calls), 3)
+        self.assertEqual(self.server.not_modified, 3)
+        self.assertEqual((cache.fetches, cache.revalidated), (0, 3))
+        self.assertEqual(len(pd.read_csv(raw.csv_path)), len(days(date(2024, 1, 1), TODAY)))
+
+    def test_missing_store_is_restored_from_the_published_copy(self):
+        _, gold, _ = self.sources()
+        gold.csv_path.unlink()
+        self.run_ingest([gold])
+
+        self.assertEqual(self.server.calls, ["/seed/gold.csv", "/metals/timeseries"])
+        gold_rows = pd.read_csv(gold.csv_path)
+        self.assertEqual(gold_rows["Date"].iloc[0], "1968-01-02")
+        self.assertEqual(gold_rows["Date"].iloc[-1], "2024-03-08")
+
+    def test_failed_source_does_not_hold_back_the_others(self):
+        btc, gold, raw = self.sources()
+        report = self.dir / "ingest_report.json"
+        orchestrator = functools.partial(ingest.Orchestrator, today=TODAY)
+        with mock.patch.dict(os.environ, {"METALS_DEV_API_KEY": ""}), \
+                mock.patch.object(ingest, "SOURCES", [btc, gold, raw]), \
+                mock.patch.object(ingest, "Orchestrator", orchestrator):
+            ok = ingest.run_sources(["btc", "gold"], cache=ingest.HttpCache(self.dir / "cache", clock=lambda: self.now),
+                                    report=report)
+
+        self.assertFalse(ok)
+        outcome = json.loads(report.read_text())
+        self.assertFalse(outcome["ok"])
+        self.assertEqual(outcome["sources"]["btc"], {"ok": True, "added": len(days(date(2024, 2, 1), TODAY)) - 8})
+        self.assertFalse(outcome["sources"]["gold"]["ok"])
+        self.assertIn("METALS_DEV_API_KEY", outcome["sources"]["gold"]["error"])
+        self.assertEqual(pd.read_csv(btc.csv_path)["Date"].iloc[-1], "10/03/2024")
+        self.assertEqual(pd.read_csv(gold.csv_path)["Date"].iloc[-1], "2024-03-01")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,196 @@
+import os
+import sys
+import json
+import random
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import tweepy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import post_to_x  # noqa: E402
+
+
+def http_error(cls, status_code, headers=None):
+    """A tweepy HTTP exception as raised for a response with this status."""
+    response = SimpleNamespace(status_code=status_code, reason="error", headers=headers or {})
+    return cls(response, response_json={})
+
+
+class FakeClock:
+    """Manual clock; sleeping advances it instead of blocking."""
+
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeX:
+    """
+    Stand-in for the X upload (v1.1 chunked_upload_*) and tweet (v2 create_tweet) endpoints.
+
+    `failures` maps a call name ("init", "append:<segment>", "finalize", "tweet") to a list
+    of exceptions raised, one per call, before that call starts succeeding.
+    """
+
+    def __init__(self, failures=None):
+        self.failures = {name: list(errors) for name, errors in (failures or {}).items()}
+        self.calls = []
+        self.segments = {}
+        self.tweets = []
+
+    def _call(self, name):
+        self.calls.append(name)
+        if self.failures.get(name):
+            raise self.failures[name].pop(0)
+
+    def chunked_upload_init(self, total_bytes, media_type, media_category=None):
+        self._call("init")
+        media_id = 1000 + self.calls.count("init")
+        self.segments[media_id] = {}
+        return SimpleNamespace(media_id=media_id, expires_after_secs=86400)
+
+    def chunked_upload_append(self, media_id, chunk, segment_index):
+        self._call(f"append:{segment_index}")
+        self.segments[media_id][segment_index] = chunk
+
+    def chunked_upload_finalize(self, media_id):
+        self._call("finalize")
+        return SimpleNamespace(media_id=media_id, expires_after_secs=86400)
+
+    def create_tweet(self, text, media_ids):
+        self._call("tweet")
+        self.tweets.append((text, media_ids))
+        return SimpleNamespace(data={"id": 5000 + len(self.tweets)})
+
+    def uploaded_bytes(self, media_id):
+        parts = self.segments[media_id]
+        return b"".join(parts[i] for i in sorted(parts))
+
+
+class PostToXTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.jpg_path = os.path.join(self.tmp.name, "chart.jpg")
+        self.state_path = os.path.join(self.tmp.name, "x_post_state.json")
+        # Three upload segments, the last one partial
+        self.image = os.urandom(2 * post_to_x.CHUNK_SIZE + 1234)
+        with open(self.jpg_path, "wb") as f:
+            f.write(self.image)
+        self.clock = FakeClock()
+
+    def post(self, fake, resume_only=False):
+        return post_to_x.post_to_x(self.jpg_path, self.state_path, resume_only=resume_only,
+                                   clients=(fake, fake), clock=self.clock, sleep=self.clock.sleep,
+                                   rng=random.Random(0))
+
+    def state(self):
+        with open(self.state_path) as f:
+            return json.load(f)
+
+    def test_posts_once_per_chart(self):
+        fake = FakeX()
+        self.assertTrue(self.post(fake))
+        self.assertEqual(fake.calls, ["init", "append:0", "append:1", "append:2", "finalize", "tweet"])
+        self.assertEqual(fake.uploaded_bytes(1001), self.image)
+        self.assertEqual(self.state()["tweet_id"], "5001")
+
+        self.assertTrue(self.post(fake))
+        self.assertTrue(self.post(fake, resume_only=True))
+        self.assertEqual(len(fake.tweets), 1)
+
+    def test_resume_only_never_starts_a_new_post(self):
+        fake = FakeX()
+        self.assertTrue(self.post(fake, resume_only=True))
+        self.assertEqual(fake.calls, [])
+        self.assertFalse(os.path.exists(self.state_path))
+
+    def test_failed_segment_resumes_without_reupload(self):
+        fake = FakeX({"append:1": [ConnectionError("reset")]})
+        self.assertTrue(self.post(fake))
+        self.assertEqual(fake.calls.count("init"), 1)
+        self.assertEqual(fake.calls.count("append:0"), 1)
+        self.assertEqual(fake.calls.count("append:1"), 2)
+        self.assertEqual(fake.uploaded_bytes(1001), self.image)
+        self.assertEqual(len(self.clock.sleeps), 1)
+
+    def test_finalized_media_is_reused_by_a_later_run(self):
+        fake = FakeX({"tweet": [http_error(tweepy.TwitterServerError, 503)] * post_to_x.MAX_ATTEMPTS_PER_RUN})
+        self.assertFalse(self.post(fake))
+        self.assertTrue(self.state()["finalized"])
+
+        self.clock.now = self.state()["next_attempt_at"]
+        self.assertTrue(self.post(fake, resume_only=True))
+        self.assertEqual(fake.calls.count("init"), 1)
+        self.assertEqual(fake.calls.count("finalize"), 1)
+        self.assertEqual(fake.tweets[-1][1], [1001])
+
+    def test_no_sleep_after_the_last_attempt_of_a_run(self):
+        fake = FakeX({"init": [ConnectionError("down")] * post_to_x.MAX_ATTEMPTS_PER_RUN})
+        self.assertFalse(self.post(fake))
+        self.assertEqual(fake.calls.count("init"), post_to_x.MAX_ATTEMPTS_PER_RUN)
+        self.assertEqual(len(self.clock.sleeps), post_to_x.MAX_ATTEMPTS_PER_RUN - 1)
+        self.assertEqual(self.state()["attempts"], post_to_x.MAX_ATTEMPTS_PER_RUN)
+
+    def test_deferred_run_leaves_early_attempts_to_later(self):
+        fake = FakeX({"init": [ConnectionError("down")] * post_to_x.MAX_ATTEMPTS_PER_RUN})
+        self.post(fake)
+        calls = len(fake.calls)
+        self.assertGreater(self.state()["next_attempt_at"], self.clock.now)
+        self.assertFalse(self.post(fake, resume_only=True))
+        self.assertEqual(len(fake.calls), calls)
+
+    def test_rate_limit_waits_for_the_reset(self):
+        reset_at = self.clock.now + 120
+        fake = FakeX({"tweet": [http_error(tweepy.TooManyRequests, 429, {"x-rate-limit-reset": str(reset_at)})]})
+        self.assertTrue(self.post(fake))
+        self.assertGreaterEqual(self.clock.sleeps[0], 120)
+
+    def test_reset_header_is_ignored_on_other_errors(self):
+        reset_at = self.clock.now + 3600
+        error = http_error(tweepy.TwitterServerError, 503, {"x-rate-limit-reset": str(reset_at)})
+        self.assertIsNone(post_to_x.rate_limit_reset(error))
+
+    def test_non_retryable_error_is_not_repeated_by_resume_runs(self):
+        fake = FakeX({"tweet": [http_error(tweepy.Forbidden, 403)]})
+        with self.assertRaises(tweepy.Forbidden):
+            self.post(fake)
+        self.assertEqual(self.clock.sleeps, [])
+        self.assertTrue(self.state()["gave_up"])
+
+        calls = len(fake.calls)
+        self.clock.now += 30 * 60
+        self.assertFalse(self.post(fake, resume_only=True))
+        self.assertEqual(len(fake.calls), calls)
+
+    def test_gives_up_after_the_retry_window(self):
+        fake = FakeX({"init": [ConnectionError("down")] * post_to_x.MAX_ATTEMPTS_PER_RUN})
+        self.post(fake)
+        calls = len(fake.calls)
+        self.clock.now += post_to_x.MAX_RETRY_DURATION
+        with mock.patch.object(post_to_x, "create_clients") as create_clients:
+            with self.assertRaises(TimeoutError):
+                post_to_x.post_to_x(self.jpg_path, self.state_path, resume_only=True, clock=self.clock)
+            create_clients.assert_not_called()
+        self.assertTrue(self.state()["gave_up"])
+
+        # Later resume runs find the marker and leave X alone
+        self.clock.now += 30 * 60
+        self.assertFalse(self.post(fake, resume_only=True))
+        self.assertEqual(len(fake.calls), calls)
+
+
+if __name__ == "__main__":
+    unittest.main()
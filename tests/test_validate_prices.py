@@ -0,0 +1,73 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "scripts"))
+
+import validate_prices  # noqa: E402
+
+
+class ValidatePricesTest(unittest.TestCase):
+    """Incremental checks of rows appended to a scratch copy of data/BTC_Prices.csv."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.csv = Path(self.tmp.name) / "BTC_Prices.csv"
+        shutil.copy(ROOT / "data" / "BTC_Prices.csv", self.csv)
+        series = dict(validate_prices.SERIES["btc"], csv=self.csv)
+        patch = mock.patch.dict(validate_prices.SERIES, {"btc": series})
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.baseline = self.validate()
+        self.index = self.csv.with_suffix(".index.json").read_text()
+
+    def validate(self):
+        with open(os.devnull, "w") as devnull, mock.patch.object(sys, "stderr", devnull):
+            return validate_prices.validate_series("btc")
+
+    def append(self, *rows):
+        with open(self.csv, "a") as f:
+            f.writelines(f"{row}\n" for row in rows)
+
+    def next_date(self):
+        return (pd.Timestamp(self.baseline["last_date"]) + pd.Timedelta(days=1)).strftime("%d/%m/%Y")
+
+    def baseline_value(self):
+        return float(json.loads(self.index)["last_value"])
+
+    def checks(self, report):
+        return [error["check"] for error in report["errors"]]
+
+    def test_jump_in_new_rows_blocks_the_update(self):
+        self.append(f"{self.next_date()},7.8")
+        report = self.validate()
+        self.assertEqual(report["mode"], "incremental")
+        self.assertFalse(report["ok"])
+        self.assertEqual(self.checks(report), ["outlier_jump"])
+        # The index still points before the bad row, so it is checked again next run
+        self.assertEqual(self.csv.with_suffix(".index.json").read_text(), self.index)
+
+    def test_ordinary_new_row_passes(self):
+        self.append(f"{self.next_date()},{self.baseline_value() * 1.02:.2f}")
+        report = self.validate()
+        self.assertTrue(report["ok"])
+        self.assertEqual(report["rows_checked"], 1)
+
+    def test_duplicate_date_next_to_an_invalid_row_is_reported(self):
+        value = f"{self.baseline_value():.2f}"
+        self.append(f"{self.next_date()},-5", f"{self.next_date()},{value}")
+        report = self.validate()
+        self.assertEqual(self.checks(report), ["non_positive_value", "duplicate_date"])
+
+
+if __name__ == "__main__":
+    unittest.main()
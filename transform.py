@@ -1,17 +1,67 @@
-import pandas as pd
-import numpy as np
-import plotly.graph_objects as go
 import os
+import json
+import hashlib
 import logging
-import statsmodels.api as sm
-from sklearn.metrics import mean_squared_error
+import argparse
+
+import channel
+from channel import RAW_CSV, GENESIS_DATE, FIRST_DATE, FORECAST_DAYS, BAND_QUANTILES, BAND_LABELS
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def transform_data():
+CHART_JSON = "btc_usd_chart.json"
+CACHE_STAMP = ".transform_cache.json"
+OUTPUTS = ("transformed_btc_usd.csv", CHART_JSON, "charts/btc_usd_chart.jpg")
+
+
+def input_fingerprint():
+    """SHA-256 over the raw input and the chart code, so a code change also invalidates the cache."""
+    digest = hashlib.sha256()
+    for path in (RAW_CSV, __file__, channel.__file__):
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def is_cache_hit(fingerprint):
+    """True if the outputs on disk were produced from exactly this input."""
+    if not os.path.exists(CACHE_STAMP) or not all(os.path.exists(path) for path in OUTPUTS):
+        return False
+    with open(CACHE_STAMP) as f:
+        return json.load(f).get("fingerprint") == fingerprint
+
+
+def write_chart_json(path, chart, dates, values):
+    """
+    Write the chart spec followed by its price rows, one row per line.
+
+    Each day's file then differs from the previous one by the header line and one new row.
+    """
+    header = json.dumps(chart, separators=(",", ":"))[:-1]
+    rows = ",\n".join(
+        json.dumps([date.strftime("%Y-%m-%d"), None if value != value else float(value)], separators=(",", ":"))
+        for date, value in zip(dates, values))
+    with open(path, "w") as f:
+        f.write(f'{header},"prices":[\n{rows}\n]}}\n')
+
+
+def transform_data(force=False):
     try:
+        fingerprint = input_fingerprint()
+        if not force and is_cache_hit(fingerprint):
+            logging.info(f"Cache hit: outputs already built from this {RAW_CSV}. Nothing to transform.")
+            return
+
+        # Heavy imports are deferred until a rebuild is actually needed
+        import numpy as np
+        import pandas as pd
+        import plotly.graph_objects as go
+        import statsmodels.api as sm
+        from diagnostics import goodness_of_fit
+
         # Load raw data
-        df = pd.read_csv("raw_btc_usd.csv")
+        df = pd.read_csv(RAW_CSV)
         logging.info("Transforming data...")
         print(df)
         # Clean data
@@ -38,11 +88,11 @@ def transform_data():
         df = btc_data.reset_index()
         df.Date = pd.to_datetime(df.Date)
         df.sort_values(by="Date", inplace = True)
-        genesis = pd.to_datetime("2009-01-03")
+        genesis = pd.to_datetime(GENESIS_DATE)
         print(df)
         print("genesis Date:", genesis)
         #Genesis block is 3rd Jan, 2009, above value is actually 2nd Jan
-        df = df[df.Date >= "2010-07-18"]    #useful data from exchanges from 2010 onwards
+        df = df[df.Date >= FIRST_DATE]    #useful data from exchanges from 2010 onwards
         df=df.reset_index(drop=True)
         df=df.drop("index", axis=1)
         #delta = (df.Date[0] - genesis).days - 1
@@ -74,8 +124,8 @@ def transform_data():
         X_with_const = sm.add_constant(X)
         
         # Define the quantiles of interest
-        quantiles = [0.001, 0.05, 0.50, 0.90, 0.98, 0.999]  # Ensure correct formatting
-        quantile_labels = ['0.1%', '5%', '50%', '90%', '98%', '99.9%']
+        quantiles = BAND_QUANTILES  # Ensure correct formatting
+        quantile_labels = BAND_LABELS
         
         # Create a dictionary to store the results for each quantile
         quant_reg_results = {}
@@ -119,33 +169,20 @@ def transform_data():
         # The quantile regression equation for the 1% quantile
         print(f"Quantile regression equation (1%): Predicted Price = e^({quant_reg_results[0.001].params[1]} * ln(number of days since genesis block) + {quant_reg_results[0.001].params[0]})")
         
-        # Calculate and print the Mean Squared Error for the 50% quantile
-        mse_50_percent = mean_squared_error(y, quant_reg_results[0.5].predict(X_with_const))
-        print(f"Mean squared error (50% quantile): {mse_50_percent:.2f}")
-        
-        # Print the pseudo R-squared for the 50% quantile regression
-        print(f"Pseudo R-squared (50% quantile): {quant_reg_results[0.5].prsquared:.2f}")
-        
-        # Calculate and print the Mean Squared Error for the 5% quantile
-        mse_50_percent = mean_squared_error(y, quant_reg_results[0.05].predict(X_with_const))
-        print(f"Mean squared error (5% quantile): {mse_50_percent:.2f}")
-        
-        # Print the pseudo R-squared for the 5% quantile regression
-        print(f"Pseudo R-squared (5% quantile): {quant_reg_results[0.05].prsquared:.2f}")
-        
-        # Calculate and print the Mean Squared Error for the 1% quantile
-        mse_50_percent = mean_squared_error(y, quant_reg_results[0.001].predict(X_with_const))
-        print(f"Mean squared error (1% quantile): {mse_50_percent:.2f}")
-        
-        # Print the pseudo R-squared for the 1% quantile regression
-        print(f"Pseudo R-squared (1% quantile): {quant_reg_results[0.001].prsquared:.2f}")
+        # Goodness of fit for all band quantiles in one vectorized pass (see diagnostics.py)
+        band_params = np.array([quant_reg_results[q].params for q in quantiles])
+        band_fit = goodness_of_fit(X.to_numpy(), y.to_numpy(), quantiles, band_params)
+        for i, label in enumerate(quantile_labels):
+            print(f"{label} quantile: mean squared error {band_fit['mse'][i]:.2f}, "
+                  f"pseudo R-squared {band_fit['pseudo_r2'][i]:.2f}, pinball loss {band_fit['pinball'][i]:.4f}, "
+                  f"coverage {band_fit['coverage'][i]:.2%}, crossings {band_fit['crossings'][i]}")
         
         
         ###################################################################################################################
         ###################################################################################################################
         ###################################################################################################################
         # === STEP 1: Extend 5 years into the future ===
-        future_dates = pd.date_range(start=df['Date'].max() + pd.Timedelta(days=1), periods=5*365, freq='D')
+        future_dates = pd.date_range(start=df['Date'].max() + pd.Timedelta(days=1), periods=FORECAST_DAYS, freq='D')
         future_df = pd.DataFrame({'Date': future_dates})
         future_df['ind'] = (future_df['Date'] - genesis).dt.days
         
@@ -173,15 +210,15 @@ def transform_data():
         fig = go.Figure()
         
         # Add traces for the price and 50% quantile
-        fig.add_trace(go.Scatter(x=df['Date'], y=df['Value'], mode='lines', name='Price', line=dict(color='orange', width=3)))
+        fig.add_trace(go.Scatter(x=df['Date'], y=df['Value'], mode='lines', name='Price', meta='price', line=dict(color='orange', width=3)))
         
-        fig.add_trace(go.Scatter(x=combined_df['Date'], y=combined_df['LinearReg_50%'], mode='lines', name='50% Quantile', line=dict(color='cyan', width=2)))
-        fig.add_trace(go.Scatter(x=combined_df['Date'], y=combined_df['LinearReg_0.1%'], fill=None, mode='lines', line=dict(color='#A8D800', width=1), name='0.1% Quantile', showlegend=False))
-        fig.add_trace(go.Scatter(x=combined_df['Date'], y=combined_df['LinearReg_5%'], fill='tonexty', mode='lines', line=dict(color='#00FF7F', width=0), name='5% Quantile', showlegend=False))
-        fig.add_trace(go.Scatter(x=combined_df['Date'], y=combined_df['LinearReg_90%'], fill=None, mode='lines', line=dict(color='#00BFFF', width=1), name='90% Quantile', showlegend=False))
+        fig.add_trace(go.Scatter(x=combined_df['Date'], y=combined_df['LinearReg_50%'], meta='50%', mode='lines', name='50% Quantile', line=dict(color='cyan', width=2)))
+        fig.add_trace(go.Scatter(x=combined_df['Date'], y=combined_df['LinearReg_0.1%'], meta='0.1%', fill=None, mode='lines', line=dict(color='#A8D800', width=1), name='0.1% Quantile', showlegend=False))
+        fig.add_trace(go.Scatter(x=combined_df['Date'], y=combined_df['LinearReg_5%'], meta='5%', fill='tonexty', mode='lines', line=dict(color='#00FF7F', width=0), name='5% Quantile', showlegend=False))
+        fig.add_trace(go.Scatter(x=combined_df['Date'], y=combined_df['LinearReg_90%'], meta='90%', fill=None, mode='lines', line=dict(color='#00BFFF', width=1), name='90% Quantile', showlegend=False))
         #fig.add_trace(go.Scatter(x=combined_df['Date'], y=combined_df['LinearReg_98%'], fill='tonexty', mode='lines', line=dict(color='#87CEFA', width=0), name='98% Quantile', showlegend=False))
-        fig.add_trace(go.Scatter(x=combined_df['Date'], y=combined_df['LinearReg_98%'], fill='tonexty', mode='lines', line=dict(color='#87CEFA', width=1), name='98% Quantile', showlegend=False))
-        fig.add_trace(go.Scatter(x=combined_df['Date'], y=combined_df['LinearReg_99.9%'], fill='tonexty', mode='lines', line=dict(color='#FF4500', width=0), name='99.9% Quantile', showlegend=False))
+        fig.add_trace(go.Scatter(x=combined_df['Date'], y=combined_df['LinearReg_98%'], meta='98%', fill='tonexty', mode='lines', line=dict(color='#87CEFA', width=1), name='98% Quantile', showlegend=False))
+        fig.add_trace(go.Scatter(x=combined_df['Date'], y=combined_df['LinearReg_99.9%'], meta='99.9%', fill='tonexty', mode='lines', line=dict(color='#FF4500', width=0), name='99.9% Quantile', showlegend=False))
         
         
         
@@ -403,19 +440,42 @@ def transform_data():
         ######################################################################################################################################
 
 
-        # Save chart as HTML with config
-        fig.write_html("btc_usd_chart.html", auto_open=False, config=config)
+        # Save the chart as price rows plus band coefficients. The HTML shell published by load.py
+        # computes the band curves in the browser, so the daily data file grows by about one row.
+        figure = json.loads(fig.to_json())
+        for trace in figure["data"]:
+            trace.pop("x", None)
+            trace.pop("y", None)
+        chart = {
+            "channel": {
+                "genesis": GENESIS_DATE,
+                "first_ind": int(df["ind"].iloc[0]),
+                "forecast_days": FORECAST_DAYS,
+                "bands": {label: [float(p) for p in quant_reg_results[q].params]
+                          for q, label in zip(BAND_QUANTILES, BAND_LABELS)},
+            },
+            "data": figure["data"],
+            "layout": figure["layout"],
+            "config": config,
+        }
+        write_chart_json(CHART_JSON, chart, df['Date'], df['Value'])
         # Chart URL: https://carlosmassa.github.io/btc-etl-pipeline/charts/btc_usd_chart.html
-        logging.info("Plotly chart saved as btc_usd_chart.html with custom config")
+        logging.info(f"Chart data saved as {CHART_JSON} with custom config")
 
         # Save chart as HD JPG
         os.makedirs("charts", exist_ok=True)
         jpg_path = "charts/btc_usd_chart.jpg"
         fig.write_image(jpg_path, width=1600, height=900, scale=2)
         logging.info(f"HD JPG chart saved as {jpg_path}")
+
+        with open(CACHE_STAMP, "w") as f:
+            json.dump({"fingerprint": fingerprint}, f)
     except Exception as e:
         logging.error(f"Transformation failed: {str(e)}")
         raise
 
 if __name__ == "__main__":
-    transform_data()
+    parser = argparse.ArgumentParser(description="Fit the power law quantile channel and render the chart.")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the outputs match the raw input.")
+    args = parser.parse_args()
+    transform_data(force=args.force)